@@ -3,15 +3,27 @@ Command line interface for the data masking library.
 """
 
 import json
+import math
 import sys
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, Optional
 
 import click
 import yaml
 
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
 from .masker import DataMasker
-from .config import MaskingConfig, MaskingStrategy
+from .config import MaskingConfig
 
 
 @click.group()
@@ -33,7 +45,9 @@ def main():
               help='Partially mask values')
 @click.option('--confidence-threshold', '-t', type=float, default=0.8, 
               help='Confidence threshold for PII detection')
-def mask(input_file, output_file, config, strategy, preserve_format, partial_mask, confidence_threshold):
+@click.option('--workers', '-w', type=int, default=1,
+              help='Worker processes for masking top-level lists (0 = one per CPU)')
+def mask(input_file, output_file, config, strategy, preserve_format, partial_mask, confidence_threshold, workers):
     """Mask PII in a file."""
     
     # Load configuration
@@ -41,15 +55,24 @@ def mask(input_file, output_file, config, strategy, preserve_format, partial_mas
         config_data = load_config(config)
         masking_config = MaskingConfig(**config_data)
     else:
-        masking_config = MaskingConfig(
-            strategy=MaskingStrategy(strategy),
+        # Click has already validated the option values
+        masking_config = MaskingConfig.fast_create(
+            strategy=strategy,
             preserve_format=preserve_format,
             partial_mask=partial_mask,
             confidence_threshold=confidence_threshold
         )
     
-    # Load input data
+    masker = DataMasker(masking_config)
     input_path = Path(input_file)
+    output_path = Path(output_file)
+    
+    # Stream record by record when neither side needs the whole document
+    if stream_mask(masker, input_path, output_path, workers):
+        click.echo(f"Successfully masked data and saved to {output_file}")
+        return
+    
+    # Load input data
     try:
         if input_path.suffix.lower() == '.json':
             with open(input_path, 'r', encoding='utf-8') as f:
@@ -65,16 +88,17 @@ def mask(input_file, output_file, config, strategy, preserve_format, partial_mas
         click.echo(f"Error loading input file: {e}", err=True)
         sys.exit(1)
     
-    # Mask the data
-    masker = DataMasker(masking_config)
-    masked_data = masker.mask(data)
+    # Mask the data; records of a top-level list are independent of each other
+    if isinstance(data, list):
+        masked_data = masker.mask_many(data, workers=workers or None)
+    else:
+        masked_data = masker.mask(data)
     
     # Save output
-    output_path = Path(output_file)
     try:
         if output_path.suffix.lower() == '.json':
             with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(masked_data, f, indent=2, ensure_ascii=False)
+                f.write(dumps_json(masked_data))
         elif output_path.suffix.lower() in ['.yml', '.yaml']:
             with open(output_path, 'w', encoding='utf-8') as f:
                 yaml.dump(masked_data, f, default_flow_style=False)
@@ -104,7 +128,7 @@ def analyze(input_file, config, confidence_threshold, format):
         config_data = load_config(config)
         masking_config = MaskingConfig(**config_data)
     else:
-        masking_config = MaskingConfig(confidence_threshold=confidence_threshold)
+        masking_config = MaskingConfig.fast_create(confidence_threshold=confidence_threshold)
     
     # Load input data
     input_path = Path(input_file)
@@ -125,37 +149,22 @@ def analyze(input_file, config, confidence_threshold, format):
     
     # Analyze the data
     masker = DataMasker(masking_config)
-    analysis = masker.analyze(data)
+    # The table only shows counts, so don't keep every match around for it
+    analysis = masker.analyze(data, return_matches=format != 'table')
     
     # Output results
     if format == 'json':
         # Convert PIIMatch objects to dictionaries for JSON serialization
         if 'matches' in analysis:
-            analysis['matches'] = [
-                {
-                    'text': match.text,
-                    'start': match.start,
-                    'end': match.end,
-                    'pattern_name': match.pattern_name,
-                    'confidence': match.confidence,
-                    'category': match.category
-                }
-                for match in analysis['matches']
-            ]
-        click.echo(json.dumps(analysis, indent=2))
+            analysis['matches'] = [match._asdict() for match in analysis['matches']]
+        click.echo(dumps_json(analysis, ensure_ascii=True))
     elif format == 'yaml':
         if 'matches' in analysis:
-            analysis['matches'] = [
-                {
-                    'text': match.text,
-                    'start': match.start,
-                    'end': match.end,
-                    'pattern_name': match.pattern_name,
-                    'confidence': match.confidence,
-                    'category': match.category
-                }
-                for match in analysis['matches']
-            ]
+            analysis['matches'] = [match._asdict() for match in analysis['matches']]
+        # Counters would otherwise be dumped as Python-specific YAML tags
+        analysis['categories'] = dict(analysis['categories'])
+        analysis['patterns'] = dict(analysis['patterns'])
+        analysis['confidence_distribution'] = dict(analysis['confidence_distribution'])
         click.echo(yaml.dump(analysis, default_flow_style=False))
     else:
         # Table format
@@ -185,7 +194,7 @@ def analyze(input_file, config, confidence_threshold, format):
 def generate_config(output_file):
     """Generate a sample configuration file."""
     config = MaskingConfig()
-    config_dict = config.dict()
+    config_dict = config.model_dump(mode='json')
     
     output_path = Path(output_file)
     try:
@@ -202,6 +211,127 @@ def generate_config(output_file):
     click.echo(f"Sample configuration saved to {output_file}")
 
 
+# Stands for the first document of an empty YAML stream
+_NO_DOCUMENT = object()
+
+
+def stream_mask(masker: DataMasker, input_path: Path, output_path: Path, workers: int = 1) -> bool:
+    """Mask a file record by record without loading it all into memory.
+    
+    Handles a top-level JSON array written back to JSON (requires ijson)
+    and YAML document streams written back to YAML; records are masked by
+    ``workers`` processes. Returns False when the
+    files need the regular load-mask-save path instead.
+    """
+    input_suffix = input_path.suffix.lower()
+    output_suffix = output_path.suffix.lower()
+    
+    try:
+        if input_suffix == '.json' and output_suffix == '.json':
+            items = iter_json_array(input_path)
+            if items is None:
+                return False
+            write_json_array(masker.iter_mask_many(items, workers=workers or None), output_path)
+        elif input_suffix in ['.yml', '.yaml'] and output_suffix in ['.yml', '.yaml']:
+            with open(input_path, 'r', encoding='utf-8') as src, \
+                    open(output_path, 'w', encoding='utf-8') as dst:
+                documents = yaml.safe_load_all(src)
+                first = next(documents, _NO_DOCUMENT)
+                if first is _NO_DOCUMENT:
+                    # Written like the regular path's yaml.dump(None)
+                    yaml.dump(None, dst, default_flow_style=False)
+                else:
+                    documents = masker.iter_mask_many(chain([first], documents), workers=workers or None)
+                    yaml.dump_all(documents, dst, default_flow_style=False)
+        else:
+            return False
+    except Exception as e:
+        click.echo(f"Error masking file: {e}", err=True)
+        sys.exit(1)
+    
+    return True
+
+
+def iter_json_array(input_path: Path) -> Optional[Iterator[Any]]:
+    """Return an iterator over a top-level JSON array, or None if not applicable."""
+    if ijson is None:
+        return None
+    
+    # Peek at the first non-whitespace byte to see whether this is an array
+    with open(input_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(4096), b''):
+            head = chunk.lstrip()
+            if head:
+                break
+        else:
+            return None
+    if not head.startswith(b'['):
+        return None
+    
+    def items() -> Iterator[Any]:
+        with open(input_path, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+    
+    return items()
+
+
+def _has_unportable_float(data: Any) -> bool:
+    """Check whether data holds a float orjson writes differently from json.
+    
+    orjson writes NaN and infinities as null and never uses the exponent
+    form (1e-05, 1e+16) that json takes from repr(); other floats come out
+    the same.
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value) or 'e' in repr(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value)
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+def dumps_json(data: Any, ensure_ascii: bool = False) -> str:
+    """Serialize data as JSON indented by two spaces, like json.dumps(indent=2).
+    
+    Uses orjson when it is installed, except for data holding floats that
+    orjson would write differently: those go through json, so NaN stays
+    NaN rather than becoming null. orjson cannot escape non-ASCII text, so
+    with ensure_ascii such output also goes through json.
+    """
+    if orjson is not None:
+        try:
+            dumped = orjson.dumps(
+                data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            ).decode('utf-8')
+        except TypeError:
+            # orjson rejects some values json accepts, such as integers
+            # wider than 64 bits
+            pass
+        else:
+            # Checked after dumping, which has ruled out circular data
+            if not (ensure_ascii and not dumped.isascii()) and not _has_unportable_float(data):
+                return dumped
+    return json.dumps(data, indent=2, ensure_ascii=ensure_ascii)
+
+
+def write_json_array(items: Iterable[Any], output_path: Path) -> None:
+    """Write items as a JSON array, one at a time, formatted like json.dump(indent=2)."""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        empty = True
+        for item in items:
+            f.write('\n  ' if empty else ',\n  ')
+            f.write(dumps_json(item).replace('\n', '\n  '))
+            empty = False
+        f.write(']' if empty else '\n]')
+
+
 def load_config(config_file: str) -> Dict[str, Any]:
     """Load configuration from file."""
     config_path = Path(config_file)
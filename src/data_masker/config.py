@@ -3,7 +3,7 @@ Configuration classes for the data masking library.
 """
 
 from enum import Enum
-from typing import Dict, Optional, Any
+from typing import Dict, FrozenSet, Optional, Any
 from pydantic import BaseModel, Field
 
 
@@ -64,11 +64,35 @@ class MaskingConfig(BaseModel):
         description="Whether to preserve email domains and phone area codes"
     )
     
-    whitelist: list[str] = Field(
-        default_factory=list,
-        description="Values to never mask"
+    regex_backend: str = Field(
+        default="re",
+        description="Regex engine for PII detection ('re', 're2' or 'hyperscan')"
+    )
+    
+    whitelist: FrozenSet[str] = Field(
+        default_factory=frozenset,
+        description="Values to never mask (stored as a frozenset for O(1) lookups)"
     )
     
     class Config:
         """Pydantic configuration."""
         use_enum_values = True
+    
+    @classmethod
+    def fast_create(cls, **values: Any) -> "MaskingConfig":
+        """Build a config from trusted values, skipping pydantic validation.
+        
+        Missing fields get their defaults, but nothing is checked: pass values
+        of the declared types. Only the strategy enum and the whitelist are
+        normalized, since maskers rely on a frozenset whitelist they can hold
+        by reference. Meant for internal use and for inputs already validated
+        elsewhere, such as CLI options.
+        """
+        strategy = values.get("strategy")
+        if isinstance(strategy, MaskingStrategy):
+            # Match what use_enum_values stores on validated configs
+            values["strategy"] = strategy.value
+        whitelist = values.get("whitelist")
+        if whitelist is not None and not isinstance(whitelist, frozenset):
+            values["whitelist"] = frozenset(whitelist)
+        return cls.model_construct(**values)
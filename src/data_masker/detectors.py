@@ -2,17 +2,23 @@
 PII detection functionality.
 """
 
-import re
-from typing import List, Dict, Any, Tuple, Optional
-from dataclasses import dataclass
+from bisect import bisect_right
+from collections import Counter, deque
+from functools import lru_cache
+from itertools import chain
+from operator import attrgetter
+from typing import List, Dict, Any, Iterable, Iterator, NamedTuple, Tuple, Optional
 
 from .patterns import PatternRegistry, PatternInfo
 from .config import MaskingConfig
 
 
-@dataclass
-class PIIMatch:
-    """Represents a detected PII match."""
+class PIIMatch(NamedTuple):
+    """Represents a detected PII match.
+    
+    A NamedTuple rather than a dataclass: detection builds one per match, and
+    tuple construction skips the Python-level ``__init__`` entirely.
+    """
     text: str
     start: int
     end: int
@@ -21,88 +27,168 @@ class PIIMatch:
     category: str
 
 
+Path = Tuple[Any, ...]
+
+# Confidence buckets: below 0.7 is low, below 0.9 medium, otherwise high
+_CONFIDENCE_BOUNDS = (0.7, 0.9)
+_CONFIDENCE_LABELS = ("low", "medium", "high")
+
+# What _summarize counts each match by
+_SUMMARY_KEY = attrgetter("category", "pattern_name", "confidence")
+
+# Leaf types that can never hold PII, skipped with one set lookup
+_SCALAR_TYPES = frozenset({int, float, bool, type(None)})
+
+# Upper bound on the joined text scanned in one batch
+_BATCH_CHARS = 1 << 20
+
+
+@lru_cache(maxsize=None)
+def _base_registry(backend: str) -> PatternRegistry:
+    """Return the shared registry of default patterns for a regex backend."""
+    return PatternRegistry(backend=backend)
+
+
+def _iter_strings(data: Any) -> Iterator[Tuple[Path, str]]:
+    """Yield (path, string) for every string leaf of nested dicts and lists.
+    
+    Uses an explicit stack instead of recursion; children are pushed in
+    reverse so leaves come out in the same depth-first order as before.
+    Raises ValueError if a container contains itself.
+    """
+    # ids of the containers above the current value; a (None, container)
+    # entry marks where that container's children are done
+    on_path = set()
+    stack = deque([((), data)])
+    while stack:
+        path, value = stack.pop()
+        if path is None:
+            on_path.discard(id(value))
+            continue
+        if type(value) in _SCALAR_TYPES:
+            continue
+        if isinstance(value, str):
+            yield path, value
+        elif isinstance(value, (dict, list)):
+            if id(value) in on_path:
+                raise ValueError("circular reference")
+            on_path.add(id(value))
+            stack.append((None, value))
+            if isinstance(value, dict):
+                stack.extend(((*path, key), item) for key, item in reversed(value.items()))
+            else:
+                stack.extend(((*path, index), value[index]) for index in reversed(range(len(value))))
+
+
+def _nest(flat: Dict[Path, List["PIIMatch"]]) -> Dict[Any, Any]:
+    """Turn path-keyed results back into the nested dict shape."""
+    nested: Dict[Any, Any] = {}
+    for path, matches in flat.items():
+        node = nested
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = matches
+    return nested
+
+
 class PIIDetector:
     """Detects personally identifiable information in text and structured data."""
     
     def __init__(self, config: Optional[MaskingConfig] = None):
-        self.config = config or MaskingConfig()
-        self.pattern_registry = PatternRegistry()
-        
-        # Add custom patterns from config
-        for name, pattern in self.config.custom_patterns.items():
-            self.pattern_registry.register(
-                name, pattern, 0.9, "custom", f"Custom pattern: {name}"
-            )
+        self.config = config or MaskingConfig.fast_create()
+        # Copy the shared default registry, adding custom patterns from
+        # config; the copy keeps register() on this detector local to it
+        self.pattern_registry = _base_registry(self.config.regex_backend).copy_with(
+            self.config.custom_patterns
+        )
+    
+    def add_custom_patterns(self, patterns: Dict[str, str]) -> None:
+        """Start detecting more custom patterns; only the new ones are compiled."""
+        self.config = self.config.model_copy(
+            update={"custom_patterns": {**self.config.custom_patterns, **patterns}}
+        )
+        self.pattern_registry.register_custom(patterns)
     
     def detect_in_text(self, text: str) -> List[PIIMatch]:
         """Detect PII in a string."""
         if not isinstance(text, str):
             return []
         
-        matches = []
-        pattern_matches = self.pattern_registry.find_matches(
+        return list(self._iter_matches(text))
+    
+    def _iter_matches(self, text: str) -> Iterator[PIIMatch]:
+        """Yield PII matches in a string lazily, in scan order."""
+        whitelist = self.config.whitelist
+        # iter_matches scans the combined regex once and already yields
+        # matches from left to right, so no sort is needed afterwards
+        for pattern_info, match in self.pattern_registry.iter_matches(
             text, self.config.confidence_threshold
-        )
+        ):
+            # Skip if in whitelist
+            value = match.group()
+            if value in whitelist:
+                continue
+            
+            start, end = match.span()
+            yield PIIMatch(
+                value, start, end,
+                pattern_info.name, pattern_info.confidence, pattern_info.category
+            )
+    
+    def detect_batch(self, texts: List[str]) -> List[List[PIIMatch]]:
+        """Detect PII in many strings, returning one match list per string.
+        
+        When the active patterns allow it, the strings that pass the registry
+        prefilter are joined with a separator no pattern can match and scanned
+        in one pass per ~1MB batch; match positions are mapped back to their
+        string by binary search on the start offsets. Positions are relative
+        to each string.
+        """
+        separator = self.pattern_registry.get_union(self.config.confidence_threshold).separator
+        if separator is None:
+            return [self.detect_in_text(text) for text in texts]
+        
+        # Strings the prefilter rules out are left out of the joined text
+        threshold = self.config.confidence_threshold
+        may_match = self.pattern_registry.may_match
+        candidates = [index for index, text in enumerate(texts) if may_match(text, threshold)]
         
-        for pattern_info, regex_matches in pattern_matches:
-            for match in regex_matches:
-                # Skip if in whitelist
-                if match.group() in self.config.whitelist:
-                    continue
-                
-                pii_match = PIIMatch(
-                    text=match.group(),
-                    start=match.start(),
-                    end=match.end(),
-                    pattern_name=pattern_info.name,
-                    confidence=pattern_info.confidence,
-                    category=pattern_info.category
+        results: List[List[PIIMatch]] = [[] for _ in texts]
+        first = 0
+        while first < len(candidates):
+            starts = []
+            size = 0
+            last = first
+            while last < len(candidates) and (last == first or size < _BATCH_CHARS):
+                starts.append(size)
+                size += len(texts[candidates[last]]) + len(separator)
+                last += 1
+            
+            joined = separator.join([texts[index] for index in candidates[first:last]])
+            for match in self._iter_matches(joined):
+                index = bisect_right(starts, match.start) - 1
+                offset = starts[index]
+                results[candidates[first + index]].append(
+                    match._replace(start=match.start - offset, end=match.end - offset)
                 )
-                matches.append(pii_match)
+            first = last
+        
+        return results
+    
+    def detect_paths(self, data: Any) -> Dict[Path, List[PIIMatch]]:
+        """Detect PII in nested data, keyed by the path to each string."""
+        leaves = list(_iter_strings(data))
+        found = self.detect_batch([text for _, text in leaves])
         
-        # Sort by position for easier processing
-        matches.sort(key=lambda x: x.start)
-        return matches
+        return {path: matches for (path, _), matches in zip(leaves, found) if matches}
     
     def detect_in_dict(self, data: Dict[str, Any]) -> Dict[str, List[PIIMatch]]:
         """Detect PII in a dictionary."""
-        results = {}
-        
-        for key, value in data.items():
-            if isinstance(value, str):
-                matches = self.detect_in_text(value)
-                if matches:
-                    results[key] = matches
-            elif isinstance(value, dict):
-                nested_results = self.detect_in_dict(value)
-                if nested_results:
-                    results[key] = nested_results
-            elif isinstance(value, list):
-                list_results = self.detect_in_list(value)
-                if list_results:
-                    results[key] = list_results
-        
-        return results
+        return _nest(self.detect_paths(data))
     
     def detect_in_list(self, data: List[Any]) -> Dict[int, Any]:
         """Detect PII in a list."""
-        results = {}
-        
-        for i, item in enumerate(data):
-            if isinstance(item, str):
-                matches = self.detect_in_text(item)
-                if matches:
-                    results[i] = matches
-            elif isinstance(item, dict):
-                nested_results = self.detect_in_dict(item)
-                if nested_results:
-                    results[i] = nested_results
-            elif isinstance(item, list):
-                list_results = self.detect_in_list(item)
-                if list_results:
-                    results[i] = list_results
-        
-        return results
+        return _nest(self.detect_paths(data))
     
     def detect(self, data: Any) -> Any:
         """Detect PII in any supported data structure."""
@@ -115,35 +201,46 @@ class PIIDetector:
         else:
             return []
     
-    def analyze_text(self, text: str) -> Dict[str, Any]:
+    def analyze_text(self, text: str, return_matches: bool = True) -> Dict[str, Any]:
         """Analyze text and return detailed statistics."""
-        matches = self.detect_in_text(text)
-        
-        stats = {
-            "total_matches": len(matches),
-            "categories": {},
-            "patterns": {},
-            "confidence_distribution": {"high": 0, "medium": 0, "low": 0},
-            "matches": matches
-        }
-        
-        for match in matches:
-            # Count by category
-            if match.category not in stats["categories"]:
-                stats["categories"][match.category] = 0
-            stats["categories"][match.category] += 1
-            
-            # Count by pattern
-            if match.pattern_name not in stats["patterns"]:
-                stats["patterns"][match.pattern_name] = 0
-            stats["patterns"][match.pattern_name] += 1
-            
-            # Confidence distribution
-            if match.confidence >= 0.9:
-                stats["confidence_distribution"]["high"] += 1
-            elif match.confidence >= 0.7:
-                stats["confidence_distribution"]["medium"] += 1
-            else:
-                stats["confidence_distribution"]["low"] += 1
+        return _summarize(self._iter_matches(text) if isinstance(text, str) else (), return_matches)
+    
+    def analyze_structure(self, data: Any, return_matches: bool = True) -> Dict[str, Any]:
+        """Analyze every string in nested dicts and lists, in the shape of ``analyze_text``.
         
-        return stats
+        Only the strings themselves are scanned, in one batch; match
+        positions are relative to the string each match was found in.
+        """
+        texts = [text for _, text in _iter_strings(data)]
+        return _summarize(chain.from_iterable(self.detect_batch(texts)), return_matches)
+
+
+def _summarize(found: Iterable[PIIMatch], return_matches: bool) -> Dict[str, Any]:
+    """Count matches by category, pattern and confidence bucket.
+    
+    The matches are counted in one C-level ``Counter`` pass by their
+    (category, pattern, confidence); those take few distinct values, so the
+    per-field counts are then summed from that small table. Unless
+    ``return_matches`` is true the matches are counted as they stream past
+    and none are kept.
+    """
+    matches = list(found) if return_matches else None
+    keys = Counter(map(_SUMMARY_KEY, found if matches is None else matches))
+    
+    categories: Counter = Counter()
+    patterns: Counter = Counter()
+    distribution = Counter(high=0, medium=0, low=0)
+    for (category, pattern_name, confidence), count in keys.items():
+        categories[category] += count
+        patterns[pattern_name] += count
+        distribution[_CONFIDENCE_LABELS[bisect_right(_CONFIDENCE_BOUNDS, confidence)]] += count
+    
+    stats: Dict[str, Any] = {
+        "total_matches": sum(keys.values()),
+        "categories": categories,
+        "patterns": patterns,
+        "confidence_distribution": distribution
+    }
+    if return_matches:
+        stats["matches"] = matches
+    return stats
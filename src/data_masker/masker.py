@@ -2,26 +2,150 @@
 Core data masking functionality.
 """
 
-import json
+import base64
+import os
 import re
-from typing import Any, Dict, List, Optional, Union
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import xxhash
 from faker import Faker
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes, hmac, padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
 from .config import MaskingConfig, MaskingStrategy
 from .detectors import PIIDetector, PIIMatch
 
 
+# str.translate table deleting every Latin-1 character except the ASCII digits
+_DIGITS_ONLY = str.maketrans('', '', ''.join(
+    chr(code) for code in range(256) if not '0' <= chr(code) <= '9'
+))
+
+# From the fourth-last digit to the end of the string
+_LAST_FOUR_DIGITS = re.compile(r'\d\D*\d\D*\d\D*\d\D*$')
+
+# Replacement for every match under the REDACT strategy
+_REDACTED = "[REDACTED]"
+
+# Runs of the mask character prebuilt per masker, by length
+_MASK_FILL_LENGTHS = 128
+
+# Most masked values remembered per masker
+_MASK_CACHE_SIZE = 10_000
+
+# How each value type is masked: str for text, bytes for UTF-8 text, dict
+# and list for containers, None for values kept as they are. Exact-type lookups skip the
+# isinstance chain for the common JSON types; others are resolved on first
+# sight (subclasses included) and remembered
+_KINDS: Dict[type, Optional[type]] = {
+    str: str, bytes: bytes, dict: dict, list: list,
+    int: None, float: None, bool: None, type(None): None,
+}
+
+# Marks a value type whose kind has not been resolved yet
+_UNRESOLVED = object()
+
+
+def _resolve_kind(cls: type) -> Optional[type]:
+    """Find and remember how values of a type not seen before are masked."""
+    kind = next((base for base in (str, bytes, dict, list) if issubclass(cls, base)), None)
+    _KINDS[cls] = kind
+    return kind
+
+
+# Faker provider method faking each pattern's values: by pattern name, then
+# by pattern name prefix, then by category; anything else becomes a word
+_FAKER_METHOD_NAMES = {"email": "email", "ssn": "ssn", "credit_card": "credit_card_number"}
+_FAKER_PREFIX_METHOD_NAMES = (("phone", "phone_number"), ("name", "name"))
+_FAKER_CATEGORY_METHOD_NAMES = {"location": "address", "personal": "name"}
+
+
+def _faker_method_name(pattern_name: str, category: str) -> str:
+    """Return the name of the Faker provider method for a pattern."""
+    name = _FAKER_METHOD_NAMES.get(pattern_name)
+    if name is not None:
+        return name
+    for prefix, name in _FAKER_PREFIX_METHOD_NAMES:
+        if pattern_name.startswith(prefix):
+            return name
+    return _FAKER_CATEGORY_METHOD_NAMES.get(category, "word")
+
+
+# Faker instances shared by the maskers of each thread, by locale, and
+# their bound provider methods, by (locale, method name); resolving an
+# attribute through the Faker proxy is slow, so it is done once
+_thread_fakers = threading.local()
+
+
+def _get_faker(locale: str) -> Faker:
+    """Return this thread's shared Faker for a locale, creating it on first use."""
+    fakers = getattr(_thread_fakers, "by_locale", None)
+    if fakers is None:
+        fakers = _thread_fakers.by_locale = {}
+    faker = fakers.get(locale)
+    if faker is None:
+        faker = fakers[locale] = Faker(locale)
+    return faker
+
+
+def _get_faker_method(locale: str, method_name: str) -> Callable[[], str]:
+    """Return a provider method of this thread's Faker for a locale."""
+    methods = getattr(_thread_fakers, "methods", None)
+    if methods is None:
+        methods = _thread_fakers.methods = {}
+    key = (locale, method_name)
+    method = methods.get(key)
+    if method is None:
+        method = methods[key] = getattr(_get_faker(locale), method_name)
+    return method
+
+
+# Masker owned by each mask_many worker process
+_worker_masker: Optional["DataMasker"] = None
+
+
+def _init_worker(config: MaskingConfig) -> None:
+    """Build the worker process's masker once, when the process starts."""
+    global _worker_masker
+    _worker_masker = DataMasker(config)
+
+
+def _mask_chunk(chunk: List[Any]) -> List[Any]:
+    """Mask one chunk of items inside a worker process."""
+    return _worker_masker.mask_list(chunk)
+
+
 class DataMasker:
     """Main class for masking personally identifiable information."""
     
     def __init__(self, config: Optional[MaskingConfig] = None):
-        self.config = config or MaskingConfig()
+        self.config = config or MaskingConfig.fast_create()
         self.detector = PIIDetector(self.config)
-        self.faker = Faker(self.config.locale)
+        
+        # Masking output built once from the mask character: a str.translate
+        # table mapping each ASCII digit to it, runs of it by length, and the
+        # dashed SSN form
+        mask = self.config.mask_character
+        self._digit_mask_table = str.maketrans(dict.fromkeys("0123456789", mask))
+        self._mask_fills = [mask * n for n in range(_MASK_FILL_LENGTHS)]
+        self._masked_ssn = f"{mask * 3}-{mask * 2}-{mask * 4}"
+        
+        # (text, pattern_name, category) -> masked value, least recently used first
+        self._mask_cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        
+        # The configured strategy's masking function, looked up once
+        self._strategy_fn = _STRATEGY_TABLE.get(
+            self.config.strategy, _STRATEGY_TABLE[MaskingStrategy.REPLACE.value]
+        )
         
         # Initialize encryption if needed
         self._fernet = None
+        self._encryption_key = self.config.encryption_key
         if self.config.strategy == MaskingStrategy.ENCRYPT:
             if self.config.encryption_key:
                 self._fernet = Fernet(self.config.encryption_key.encode())
@@ -29,73 +153,210 @@ class DataMasker:
                 # Generate a key for this session
                 key = Fernet.generate_key()
                 self._fernet = Fernet(key)
+                self._encryption_key = key.decode()
                 print(f"Generated encryption key: {key.decode()}")
+            
+            # The Fernet key halves, set up once for _encrypt_batch
+            raw_key = base64.urlsafe_b64decode(self._encryption_key)
+            self._signer = hmac.HMAC(raw_key[:16], hashes.SHA256())
+            self._cipher_algorithm = algorithms.AES(raw_key[16:])
+    
+    @property
+    def faker(self) -> Faker:
+        """The calling thread's Faker for the configured locale, created on first use.
+        
+        Loading the locale providers is slow, so maskers whose strategy never
+        fakes values never pay for it, and all maskers share one instance
+        per thread and locale; Faker is not thread-safe, so a masker used
+        from several threads fakes with each thread's own instance. Seeding
+        it (``seed_instance``) affects every masker of that thread and locale.
+        """
+        return _get_faker(self.config.locale)
+    
+    def add_custom_patterns(self, patterns: Dict[str, str]) -> None:
+        """Start masking more custom patterns; only the new ones are compiled."""
+        self.detector.add_custom_patterns(patterns)
+        self.config = self.detector.config
     
-    def mask_text(self, text: str) -> str:
-        """Mask PII in a text string."""
+    def mask_text(self, text: Union[str, bytes]) -> Union[str, bytes]:
+        """Mask PII in a text string, or in UTF-8 bytes as with mask_bytes."""
         if not isinstance(text, str):
+            if isinstance(text, bytes):
+                return self.mask_bytes(text)
             return text
         
         matches = self.detector.detect_in_text(text)
         if not matches:
             return text
         
-        # Process matches in reverse order to maintain positions
-        masked_text = text
-        for match in reversed(matches):
-            masked_value = self._apply_masking_strategy(
-                match.text, match.pattern_name, match.category
-            )
-            masked_text = (
-                masked_text[:match.start] + 
-                masked_value + 
-                masked_text[match.end:]
-            )
+        return self._apply_matches(text, matches)
+    
+    def mask_bytes(self, data: bytes, encoding: str = "utf-8") -> bytes:
+        """Mask PII in encoded text, returning the input unchanged when clean.
+        
+        Bytes that are not valid in the encoding are decoded with the
+        surrogateescape error handler, so they never match a pattern and
+        are written back exactly as they were.
+        """
+        text = data.decode(encoding, "surrogateescape")
+        matches = self.detector.detect_in_text(text)
+        if not matches:
+            return data
         
-        return masked_text
+        return self._apply_matches(text, matches).encode(encoding, "surrogateescape")
     
-    def mask_dict(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Mask PII in a dictionary."""
-        masked_data = {}
+    def _apply_matches(self, text: str, matches: List[PIIMatch]) -> str:
+        """Replace the detected matches in a string with their masked values.
         
-        for key, value in data.items():
-            if isinstance(value, str):
-                masked_data[key] = self.mask_text(value)
-            elif isinstance(value, dict):
-                masked_data[key] = self.mask_dict(value)
-            elif isinstance(value, list):
-                masked_data[key] = self.mask_list(value)
-            else:
-                masked_data[key] = value
+        The detector reports matches left to right without overlaps, so the
+        result is assembled in one forward pass.
+        """
+        strategy = self.config.strategy
+        if strategy == MaskingStrategy.REDACT:
+            replacements = [_REDACTED] * len(matches)
+        elif strategy == MaskingStrategy.ENCRYPT and self._fernet:
+            replacements = [
+                f"[ENCRYPTED:{token}]"
+                for token in self._encrypt_batch([match.text for match in matches])
+            ]
+        else:
+            replacements = [
+                self._apply_masking_strategy(match.text, match.pattern_name, match.category)
+                for match in matches
+            ]
+        
+        parts = []
+        position = 0
+        for match, replacement in zip(matches, replacements):
+            parts.append(text[position:match.start])
+            parts.append(replacement)
+            position = match.end
+        parts.append(text[position:])
         
-        return masked_data
+        return "".join(parts)
     
-    def mask_list(self, data: List[Any]) -> List[Any]:
-        """Mask PII in a list."""
-        masked_data = []
+    def _mask_container(self, data: Union[Dict[Any, Any], List[Any]]) -> Union[Dict[Any, Any], List[Any]]:
+        """Mask a dict or list and everything nested in it, without recursion.
         
-        for item in data:
-            if isinstance(item, str):
-                masked_data.append(self.mask_text(item))
-            elif isinstance(item, dict):
-                masked_data.append(self.mask_dict(item))
-            elif isinstance(item, list):
-                masked_data.append(self.mask_list(item))
-            else:
-                masked_data.append(item)
+        Each output container is created empty and put in its parent's slot
+        straight away, then filled when its source is popped off the stack,
+        so nesting depth is not limited by the recursion limit. Strings are
+        copied as they are while walking and collected; they are then all
+        scanned in one batch and the ones with matches replaced.
+        
+        Raises ValueError if a container contains itself.
+        """
+        leaves: List[Tuple[Any, Any, str]] = []
+        root: Union[Dict[Any, Any], List[Any]] = {} if isinstance(data, dict) else [None] * len(data)
+        stack: List[Tuple[Any, Any]] = [(data, root)]
+        # ids of the containers from the root down to the one being filled;
+        # a (source, None) entry marks where its children are done
+        on_path = set()
+        
+        while stack:
+            source, target = stack.pop()
+            if target is None:
+                on_path.discard(id(source))
+                continue
+            on_path.add(id(source))
+            stack.append((source, None))
+            
+            for key, value in source.items() if type(target) is dict else enumerate(source):
+                kind = _KINDS.get(type(value), _UNRESOLVED)
+                if kind is _UNRESOLVED:
+                    kind = _resolve_kind(type(value))
+                
+                if kind is None:
+                    target[key] = value
+                elif kind is str:
+                    # Keeps the slot (and dict key order) until it is masked
+                    target[key] = value
+                    leaves.append((target, key, value))
+                elif kind is bytes:
+                    target[key] = self.mask_bytes(value)
+                else:
+                    if id(value) in on_path:
+                        raise ValueError("circular reference")
+                    child = {} if kind is dict else [None] * len(value)
+                    target[key] = child
+                    stack.append((value, child))
         
-        return masked_data
+        found = self.detector.detect_batch([text for _, _, text in leaves])
+        for (target, key, text), matches in zip(leaves, found):
+            if matches:
+                target[key] = self._apply_matches(text, matches)
+        
+        return root
+    
+    def mask_dict(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Mask PII in a dictionary."""
+        return self._mask_container(data)
+    
+    def mask_list(self, data: List[Any]) -> List[Any]:
+        """Mask PII in a list."""
+        return self._mask_container(data)
     
     def mask(self, data: Any) -> Any:
         """Mask PII in any supported data structure."""
-        if isinstance(data, str):
+        kind = _KINDS.get(type(data), _UNRESOLVED)
+        if kind is _UNRESOLVED:
+            kind = _resolve_kind(type(data))
+        
+        if kind is None:
+            return data
+        elif kind is str:
             return self.mask_text(data)
-        elif isinstance(data, dict):
-            return self.mask_dict(data)
-        elif isinstance(data, list):
-            return self.mask_list(data)
+        elif kind is bytes:
+            return self.mask_bytes(data)
         else:
-            return data
+            return self._mask_container(data)
+    
+    def mask_many(
+        self,
+        items: Iterable[Any],
+        chunksize: int = 64,
+        workers: Optional[int] = None
+    ) -> List[Any]:
+        """Mask many independent items, in parallel across processes."""
+        return list(self.iter_mask_many(items, chunksize, workers))
+    
+    def iter_mask_many(
+        self,
+        items: Iterable[Any],
+        chunksize: int = 64,
+        workers: Optional[int] = None
+    ) -> Iterator[Any]:
+        """Lazily mask many independent items, in parallel across processes.
+        
+        Items are sent to a process pool in chunks, so CPU-bound regex work is
+        not serialized by the GIL. Each worker builds its own DataMasker from
+        this masker's configuration (sharing its encryption key), so results
+        are yielded in input order and match calling ``mask`` on every item.
+        ``workers`` defaults to the CPU count; with ``workers=1``, or fewer
+        items than one chunk, everything runs in this process. At most two
+        chunks per worker are in flight, so input can be a stream.
+        """
+        workers = workers or os.cpu_count() or 1
+        iterator = iter(items)
+        chunks = iter(lambda: list(islice(iterator, chunksize)), [])
+        
+        first = next(chunks, [])
+        if workers == 1 or len(first) < chunksize:
+            for chunk in chain([first], chunks):
+                yield from self.mask_list(chunk)
+            return
+        
+        worker_config = self.config.model_copy(update={"encryption_key": self._encryption_key})
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(worker_config,)
+        ) as executor:
+            pending: deque = deque()
+            for chunk in chain([first], chunks):
+                pending.append(executor.submit(_mask_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
     
     def _apply_masking_strategy(
         self, 
@@ -103,31 +364,41 @@ class DataMasker:
         pattern_name: str, 
         category: str
     ) -> str:
-        """Apply the configured masking strategy to a piece of text."""
-        
-        if self.config.strategy == MaskingStrategy.REPLACE:
-            return self._replace_strategy(text, pattern_name)
+        """Apply the configured masking strategy to a piece of text.
         
-        elif self.config.strategy == MaskingStrategy.REDACT:
-            return "[REDACTED]"
-        
-        elif self.config.strategy == MaskingStrategy.ENCRYPT:
+        Results are cached, so a value repeated across a document is masked
+        once and always gets the same replacement (the same fake name, for
+        the faker strategy). Encryption is never cached: each ciphertext
+        gets a fresh nonce.
+        """
+        if self.config.strategy == MaskingStrategy.ENCRYPT:
             return self._encrypt_strategy(text)
         
-        elif self.config.strategy == MaskingStrategy.TOKENIZE:
-            return self._tokenize_strategy(text, pattern_name)
-        
-        elif self.config.strategy == MaskingStrategy.FAKER:
-            return self._faker_strategy(text, pattern_name, category)
+        key = (text, pattern_name, category)
+        cache = self._mask_cache
+        masked = cache.get(key)
+        if masked is not None:
+            try:
+                cache.move_to_end(key)
+            except KeyError:
+                # Evicted by another thread in the meantime
+                pass
+            return masked
         
-        else:
-            # Default to replace
-            return self._replace_strategy(text, pattern_name)
+        masked = self._run_strategy(text, pattern_name, category)
+        cache[key] = masked
+        if len(cache) > _MASK_CACHE_SIZE:
+            cache.popitem(last=False)
+        return masked
+    
+    def _run_strategy(self, text: str, pattern_name: str, category: str) -> str:
+        """Run the configured masking strategy, bypassing the cache."""
+        return self._strategy_fn(self, text, pattern_name, category)
     
     def _replace_strategy(self, text: str, pattern_name: str) -> str:
         """Replace characters with mask character."""
         if not self.config.preserve_format:
-            return self.config.mask_character * len(text)
+            return self._fill(len(text))
         
         # Preserve format for specific patterns
         if pattern_name == "email":
@@ -145,95 +416,99 @@ class DataMasker:
                 masked_chars = len(text) - (2 * visible_chars)
                 return (
                     text[:visible_chars] + 
-                    self.config.mask_character * masked_chars + 
+                    self._fill(masked_chars) + 
                     text[-visible_chars:]
                 )
             else:
-                return self.config.mask_character * len(text)
+                return self._fill(len(text))
+    
+    def _fill(self, length: int) -> str:
+        """Return a run of the mask character of the given length."""
+        if length < _MASK_FILL_LENGTHS:
+            return self._mask_fills[length]
+        return self.config.mask_character * length
     
     def _mask_email(self, email: str) -> str:
         """Mask email while preserving domain if configured."""
         if '@' not in email:
-            return self.config.mask_character * len(email)
+            return self._fill(len(email))
         
         local, domain = email.split('@', 1)
         
         if self.config.preserve_domains:
-            masked_local = self.config.mask_character * len(local)
+            masked_local = self._fill(len(local))
             return f"{masked_local}@{domain}"
         else:
-            return self.config.mask_character * len(email)
+            return self._fill(len(email))
     
     def _mask_phone(self, phone: str) -> str:
         """Mask phone number while preserving format."""
         # Keep non-digit characters, mask digits
-        masked = ""
-        for char in phone:
-            if char.isdigit():
-                masked += self.config.mask_character
-            else:
-                masked += char
-        return masked
+        return phone.translate(self._digit_mask_table)
     
     def _mask_ssn(self, ssn: str) -> str:
         """Mask SSN with standard format."""
         # Remove non-digits
-        digits = re.sub(r'\D', '', ssn)
+        digits = ssn.translate(_DIGITS_ONLY)
         if len(digits) == 9:
             if '-' in ssn:
-                return f"{self.config.mask_character * 3}-{self.config.mask_character * 2}-{self.config.mask_character * 4}"
+                return self._masked_ssn
             else:
-                return self.config.mask_character * 9
-        return self.config.mask_character * len(ssn)
+                return self._fill(9)
+        return self._fill(len(ssn))
     
     def _mask_credit_card(self, card: str) -> str:
         """Mask credit card number, showing last 4 digits."""
-        digits = re.sub(r'\D', '', card)
+        digits = card.translate(_DIGITS_ONLY)
         if len(digits) >= 12:
-            masked_digits = self.config.mask_character * (len(digits) - 4) + digits[-4:]
-            # Restore original formatting
-            result = ""
-            digit_index = 0
-            for char in card:
-                if char.isdigit():
-                    result += masked_digits[digit_index]
-                    digit_index += 1
-                else:
-                    result += char
-            return result
-        return self.config.mask_character * len(card)
+            # Mask every digit before the last four, keeping the formatting
+            split = _LAST_FOUR_DIGITS.search(card).start()
+            return card[:split].translate(self._digit_mask_table) + card[split:]
+        return self._fill(len(card))
     
     def _encrypt_strategy(self, text: str) -> str:
         """Encrypt the text."""
         if self._fernet:
-            encrypted = self._fernet.encrypt(text.encode())
-            return f"[ENCRYPTED:{encrypted.decode()}]"
+            return f"[ENCRYPTED:{self._encrypt_batch([text])[0]}]"
         return "[ENCRYPTION_ERROR]"
     
+    def _encrypt_batch(self, texts: List[str]) -> List[str]:
+        """Encrypt several texts into Fernet tokens in one go.
+        
+        Produces exactly what ``Fernet.encrypt`` would, decryptable by it,
+        but shares the work Fernet repeats per call: the timestamp is read
+        once, the IVs come from one ``os.urandom`` call, the AES key is set
+        up once and each HMAC is a copy of one keyed instance.
+        """
+        header = b"\x80" + int(time.time()).to_bytes(8, "big")
+        ivs = os.urandom(16 * len(texts))
+        tokens = []
+        for index, text in enumerate(texts):
+            iv = ivs[16 * index:16 * (index + 1)]
+            padder = padding.PKCS7(algorithms.AES.block_size).padder()
+            padded = padder.update(text.encode()) + padder.finalize()
+            encryptor = Cipher(self._cipher_algorithm, modes.CBC(iv)).encryptor()
+            body = header + iv + encryptor.update(padded) + encryptor.finalize()
+            
+            signer = self._signer.copy()
+            signer.update(body)
+            tokens.append(base64.urlsafe_b64encode(body + signer.finalize()).decode())
+        return tokens
+    
     def _tokenize_strategy(self, text: str, pattern_name: str) -> str:
-        """Replace with a token."""
-        return f"[{pattern_name.upper()}_TOKEN_{hash(text) % 10000:04d}]"
+        """Replace with a token.
+        
+        Uses xxh3 rather than ``hash()``, which is salted per process: the
+        same value gets the same token in every run.
+        """
+        return f"[{pattern_name.upper()}_TOKEN_{xxhash.xxh3_64_intdigest(text.encode()) % 10000:04d}]"
     
     def _faker_strategy(self, text: str, pattern_name: str, category: str) -> str:
         """Replace with fake data."""
         try:
-            if pattern_name == "email":
-                return self.faker.email()
-            elif pattern_name.startswith("phone"):
-                return self.faker.phone_number()
-            elif pattern_name == "ssn":
-                return self.faker.ssn()
-            elif pattern_name == "credit_card":
-                return self.faker.credit_card_number()
-            elif pattern_name.startswith("name"):
-                return self.faker.name()
-            elif category == "location":
-                return self.faker.address()
-            elif category == "personal":
-                return self.faker.name()
-            else:
-                # Fallback to generic text
-                return self.faker.word()
+            # Some locales lack a provider (en_PH has no phone_number)
+            method = _get_faker_method(self.config.locale, _faker_method_name(pattern_name, category))
+            return method()
         except Exception:
             # Fallback to replace strategy
             return self._replace_strategy(text, pattern_name)
@@ -253,13 +528,28 @@ class DataMasker:
         else:
             raise ValueError("Text is not in encrypted format")
     
-    def analyze(self, data: Any) -> Dict[str, Any]:
+    def analyze(self, data: Any, return_matches: bool = True) -> Dict[str, Any]:
         """Analyze data and return PII detection statistics."""
         if isinstance(data, str):
-            return self.detector.analyze_text(data)
+            return self.detector.analyze_text(data, return_matches)
         elif isinstance(data, (dict, list)):
-            # Convert to JSON string for analysis
-            json_str = json.dumps(data, default=str)
-            return self.detector.analyze_text(json_str)
+            return self.detector.analyze_structure(data, return_matches)
         else:
             return {"error": "Unsupported data type for analysis"}
+
+
+# Masking function of each strategy, by strategy value, called as
+# fn(masker, text, pattern_name, category); unknown strategies replace
+_STRATEGY_TABLE: Dict[str, Callable[[DataMasker, str, str, str], str]] = {
+    MaskingStrategy.REPLACE.value: (
+        lambda masker, text, name, category: masker._replace_strategy(text, name)
+    ),
+    MaskingStrategy.REDACT.value: lambda masker, text, name, category: _REDACTED,
+    MaskingStrategy.ENCRYPT.value: (
+        lambda masker, text, name, category: masker._encrypt_strategy(text)
+    ),
+    MaskingStrategy.TOKENIZE.value: (
+        lambda masker, text, name, category: masker._tokenize_strategy(text, name)
+    ),
+    MaskingStrategy.FAKER.value: DataMasker._faker_strategy,
+}
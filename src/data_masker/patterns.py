@@ -2,12 +2,39 @@
 Pattern registry for PII detection.
 """
 
+import copy
 import re
-from typing import Dict, Pattern, List, Tuple
-from dataclasses import dataclass
+import sys
+import threading
+from typing import Any, Callable, Dict, Iterator, Match, Optional, Pattern, List, Tuple
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from itertools import repeat
 
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional dependency
+    ahocorasick = None
 
-@dataclass
+try:
+    import re2
+except ImportError:  # pragma: no cover - optional dependency
+    re2 = None
+
+try:
+    import hyperscan
+except ImportError:  # pragma: no cover - optional dependency
+    hyperscan = None
+
+try:  # Python 3.11+
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover
+    import sre_constants  # type: ignore[no-redef]
+    import sre_parse  # type: ignore[no-redef]
+
+
+@dataclass(frozen=True)
 class PatternInfo:
     """Information about a PII pattern."""
     name: str
@@ -17,11 +44,574 @@ class PatternInfo:
     description: str
 
 
+# Regex engines the pattern union can be compiled with
+REGEX_BACKENDS = ("re", "re2", "hyperscan")
+
+# Shortest literal prefix worth routing through the Aho-Corasick index
+MIN_LITERAL_PREFIX = 3
+
+
+def _match_order(pair: Tuple["PatternInfo", Match[str]]) -> Tuple[int, float, int]:
+    """Sort key for (pattern, match) pairs: by start, then most confident, then longest."""
+    pattern_info, match = pair
+    start, end = match.span()
+    return start, -pattern_info.confidence, start - end
+
+
+def _scan_standalone(
+    pattern_info: "PatternInfo", text: str, pos: int
+) -> Iterator[Tuple["PatternInfo", Match[str]]]:
+    """Yield (pattern, match) pairs of one pattern scanned on its own from pos."""
+    return zip(repeat(pattern_info), pattern_info.pattern.finditer(text, pos))
+
+
+class LiteralPrefixIndex:
+    """Aho-Corasick index over the literal prefixes of a group of patterns.
+    
+    The automaton finds every prefix occurrence in one pass over the text and
+    each candidate position is then confirmed with the pattern itself.
+    """
+    
+    def __init__(self, prefixes: List[Tuple[str, PatternInfo]]):
+        self.patterns = [pattern_info for _, pattern_info in prefixes]
+        self._automaton = ahocorasick.Automaton()
+        for prefix, pattern_info in prefixes:
+            key = prefix.lower()
+            entry = self._automaton.get(key, None)
+            if entry is None:
+                self._automaton.add_word(key, (len(key), [pattern_info]))
+            else:
+                entry[1].append(pattern_info)
+        self._automaton.make_automaton()
+    
+    def find_matches(self, text: str, pos: int = 0) -> List[Tuple[PatternInfo, Match[str]]]:
+        """Find matches of the indexed patterns from pos on, ordered by ``_match_order``."""
+        if not text.isascii():
+            # Case folding outside ASCII can shift offsets; scan directly instead
+            return sorted(
+                (
+                    (pattern_info, match)
+                    for pattern_info in self.patterns
+                    for match in pattern_info.pattern.finditer(text, pos)
+                ),
+                key=_match_order
+            )
+        
+        matches = []
+        resume_at: Dict[str, int] = {}
+        for end, (length, candidates) in self._automaton.iter(text.lower(), pos):
+            start = end - length + 1
+            if start < pos:
+                continue
+            for pattern_info in candidates:
+                if start < resume_at.get(pattern_info.name, 0):
+                    continue
+                match = pattern_info.pattern.match(text, start)
+                if match:
+                    matches.append((pattern_info, match))
+                    resume_at[pattern_info.name] = max(match.end(), start + 1)
+        
+        # The automaton reports hits by end position; prefixes of different
+        # lengths can make that differ from start order
+        matches.sort(key=_match_order)
+        return matches
+
+
+# Syntax Python's re and Hyperscan read differently ("x{,3}" is a repeat in
+# one and literal text in the other) or that only Python understands
+_HYPERSCAN_UNSAFE = re.compile(r"\{,|\\[uUN]|\(\?P=")
+
+# \s or \S in a pattern source
+_SPACE_CLASS = re.compile(r"\\[sS]")
+
+
+def _record_match(pattern_id: int, start: int, end: int, flags: int, found: List[int]) -> None:
+    """Hyperscan match callback collecting the ids of the patterns that matched."""
+    found.append(pattern_id)
+
+
+class HyperscanFilter:
+    """Hyperscan database telling which patterns occur anywhere in a text.
+    
+    All patterns are scanned in one vectorised pass and each reports at
+    most one hit, so the result is the set of patterns the ``re`` union
+    actually has to try. Patterns Hyperscan cannot compile exactly are
+    compiled in prefilter mode (which may over-report, never under-report)
+    or, failing that, are always treated as present.
+    """
+    
+    def __init__(self, patterns: Tuple[PatternInfo, ...]):
+        self.patterns = patterns
+        expressions, ids, flags = [], [], []
+        always = []
+        for index, pattern_info in enumerate(patterns):
+            pattern_flags = _hyperscan_flags(pattern_info.pattern)
+            if pattern_flags is None:
+                always.append(index)
+                continue
+            source = pattern_info.pattern.pattern.encode()
+            for extra in (0, hyperscan.HS_FLAG_PREFILTER):
+                try:
+                    hyperscan.Database().compile(expressions=[source], flags=[pattern_flags | extra])
+                except hyperscan.error:
+                    continue
+                expressions.append(source)
+                ids.append(index)
+                flags.append(pattern_flags | extra)
+                break
+            else:
+                always.append(index)
+        
+        self._always = always
+        self._database = None
+        if expressions:
+            self._database = hyperscan.Database()
+            self._database.compile(expressions=expressions, ids=ids, elements=len(ids), flags=flags)
+        # Hyperscan scratch space must not be shared between threads
+        self._local = threading.local()
+    
+    def present(self, text: str) -> Optional[Tuple[PatternInfo, ...]]:
+        """Return the patterns that may match text, in their original order.
+        
+        Returns None for non-ASCII text: Hyperscan works on bytes, and
+        multi-byte characters would make its classes disagree with ``re``.
+        """
+        if not text.isascii():
+            return None
+        
+        found = list(self._always)
+        if self._database is not None:
+            scratch = getattr(self._local, "scratch", None)
+            if scratch is None:
+                scratch = self._local.scratch = hyperscan.Scratch(self._database)
+            self._database.scan(text.encode(), match_event_handler=_record_match, context=found, scratch=scratch)
+        return tuple(self.patterns[index] for index in sorted(found))
+
+
+def _hyperscan_flags(pattern: Pattern[str]) -> Optional[int]:
+    """Return the Hyperscan flags matching a compiled pattern, or None if it cannot be scanned."""
+    # Only ASCII text is scanned, where re's Unicode \d and \w mean what
+    # Hyperscan's do; Unicode \s also matches \x1c-\x1f
+    if _HYPERSCAN_UNSAFE.search(pattern.pattern) or (
+        not pattern.flags & re.ASCII and _SPACE_CLASS.search(pattern.pattern)
+    ):
+        return None
+    flags = hyperscan.HS_FLAG_SINGLEMATCH
+    if pattern.flags & re.IGNORECASE:
+        flags |= hyperscan.HS_FLAG_CASELESS
+    if pattern.flags & re.MULTILINE:
+        flags |= hyperscan.HS_FLAG_MULTILINE
+    if pattern.flags & re.DOTALL:
+        flags |= hyperscan.HS_FLAG_DOTALL
+    return flags
+
+
+@dataclass
+class UnionPattern:
+    """All patterns above a confidence threshold combined into one regex."""
+    pattern: Optional[Any]
+    groups: Dict[str, PatternInfo] = field(default_factory=dict)
+    standalone: List[PatternInfo] = field(default_factory=list)
+    literals: Optional[LiteralPrefixIndex] = None
+    prefilter: Optional[Pattern[str]] = None
+    prefilter_chars: str = ""
+    min_length: int = 0
+    separator: Optional[str] = None
+    scanner: Optional[HyperscanFilter] = None
+
+
+@lru_cache(maxsize=1024)
+def _compile(pattern: str, flags: int = re.IGNORECASE) -> Pattern[str]:
+    """Compile a pattern once per process, however many registries use it."""
+    return re.compile(pattern, flags)
+
+
+def _compile_re2(source: str) -> Optional[Any]:
+    """Compile a pattern with RE2, or return None if RE2 rejects its syntax."""
+    options = re2.Options()
+    # Case folding is scoped to the alternatives that need it
+    options.case_sensitive = True
+    options.log_errors = False
+    try:
+        return re2.compile(source, options)
+    except re2.error:
+        return None
+
+
+def _iter_ops(subpattern: "sre_parse.SubPattern") -> Iterator[Tuple[object, object]]:
+    """Walk every opcode of a parsed pattern, including nested groups."""
+    for op, av in subpattern:
+        yield op, av
+        for item in av if isinstance(av, (tuple, list)) else (av,):
+            if isinstance(item, sre_parse.SubPattern):
+                yield from _iter_ops(item)
+            elif isinstance(item, list):
+                for branch in item:
+                    if isinstance(branch, sre_parse.SubPattern):
+                        yield from _iter_ops(branch)
+
+
+_BOUNDARIES = (sre_constants.AT_BOUNDARY, sre_constants.AT_NON_BOUNDARY)
+
+
+def _needs_unicode_classes(pattern: Pattern[str]) -> bool:
+    """Check whether a pattern relies on re's Unicode \\w, \\d, \\s or \\b.
+    
+    RE2's versions of these only match ASCII, so a pattern compiled without
+    re.ASCII that uses any of them would match less under RE2.
+    """
+    if pattern.flags & re.ASCII:
+        return False
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return True
+    
+    for op, av in _iter_ops(parsed):
+        if op is sre_constants.AT and av in _BOUNDARIES:
+            return True
+        items = av if op is sre_constants.IN else [(op, av)]
+        if any(item_op is sre_constants.CATEGORY for item_op, _ in items):
+            return True
+    return False
+
+
+# An unescaped named-group opener such as "(?P<area>"
+_NAMED_GROUP = re.compile(r"(?<!\\)((?:\\\\)*)\(\?P<\w+>")
+
+
+def _combinable_source(pattern: Pattern[str]) -> Optional[str]:
+    """Return a pattern's source in a form that can be one alternative of a union.
+    
+    Inner named groups would clash with the union's own group names, so they
+    are turned into plain numbered groups. Returns None when the pattern
+    cannot be embedded: backreferences would point at the wrong group once
+    the union renumbers everything, and inline global flags would leak into
+    the other alternatives.
+    """
+    source = pattern.pattern
+    try:
+        parsed = sre_parse.parse(source, 0)
+    except Exception:
+        return None
+    
+    if parsed.state.flags & ~re.UNICODE:
+        return None
+    
+    if any(
+        op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS)
+        for op, _ in _iter_ops(parsed)
+    ):
+        return None
+    
+    if pattern.groupindex:
+        source = _NAMED_GROUP.sub(r"\1(", source)
+        # The rewrite must only have dropped the names (an opener inside a
+        # character class, say, would have changed the pattern itself)
+        try:
+            stripped = sre_parse.parse(source, 0)
+        except Exception:
+            return None
+        if stripped.state.groupdict or repr(stripped.data) != repr(parsed.data):
+            return None
+    
+    return source
+
+
+def _is_cased(low: int, high: int) -> bool:
+    """Check whether any character in a code point range has another case."""
+    if high - low > 0xFF:
+        return True
+    return any(chr(code).lower() != chr(code).upper() for code in range(low, high + 1))
+
+
+def _is_case_sensitive(source: str) -> bool:
+    """Check whether a pattern matches differently with and without IGNORECASE.
+    
+    Only literal characters, character ranges and backreferences are
+    affected; escapes such as \\d and \\s are not, so digit-only formats can
+    skip case folding.
+    """
+    try:
+        parsed = sre_parse.parse(source, 0)
+    except Exception:
+        return True
+    
+    for op, av in _iter_ops(parsed):
+        items = av if op is sre_constants.IN else [(op, av)]
+        if op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS):
+            # A backreference repeats whatever case the group matched
+            return True
+        for item_op, item_av in items:
+            if item_op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL) and _is_cased(item_av, item_av):
+                return True
+            if item_op is sre_constants.RANGE and _is_cased(*item_av):
+                return True
+    return False
+
+
+def _literal_prefix(pattern: Pattern[str]) -> str:
+    """Return the literal text every match of a pattern must start with."""
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return ""
+    
+    prefix = []
+    for op, av in parsed:
+        if op is sre_constants.AT and not prefix:
+            # Leading zero-width assertions such as \b do not consume text
+            continue
+        if op is not sre_constants.LITERAL:
+            break
+        prefix.append(chr(av))
+    return "".join(prefix)
+
+
+_CATEGORY_CLASSES = {
+    sre_constants.CATEGORY_DIGIT: (r"\d", 10),
+    sre_constants.CATEGORY_SPACE: (r"\s", 6),
+    sre_constants.CATEGORY_WORD: (r"\w", 63),
+}
+
+
+def _class_items(items: List[Tuple[object, object]]) -> Optional[Dict[str, int]]:
+    """Translate a parsed character set into class items and their sizes."""
+    result: Dict[str, int] = {}
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            char = chr(av)
+            result[re.escape(char)] = 2 if char.isalpha() else 1
+        elif op is sre_constants.RANGE:
+            low, high = av
+            result[f"{re.escape(chr(low))}-{re.escape(chr(high))}"] = high - low + 1
+        elif op is sre_constants.CATEGORY and av in _CATEGORY_CLASSES:
+            source, size = _CATEGORY_CLASSES[av]
+            result[source] = size
+        else:
+            # Negated sets and categories admit almost anything
+            return None
+    return result
+
+
+def _required_chars(subpattern: "sre_parse.SubPattern") -> Optional[Dict[str, int]]:
+    """Find the smallest character class every match must contain a character of.
+    
+    Each mandatory position of the pattern is a candidate; alternations
+    contribute the union of their branches. Returns None when no position is
+    mandatory (the pattern can match the empty string) or all are unbounded.
+    """
+    best: Optional[Dict[str, int]] = None
+    for op, av in subpattern:
+        candidate: Optional[Dict[str, int]] = None
+        if op is sre_constants.LITERAL:
+            candidate = _class_items([(op, av)])
+        elif op is sre_constants.IN:
+            candidate = _class_items(av)
+        elif op is sre_constants.SUBPATTERN:
+            candidate = _required_chars(av[-1])
+        elif op in _REPEATS and av[0] >= 1:
+            candidate = _required_chars(av[2])
+        elif op is sre_constants.BRANCH:
+            branches = [_required_chars(branch) for branch in av[1]]
+            if all(branch is not None for branch in branches):
+                candidate = {k: v for branch in branches for k, v in branch.items()}
+        
+        if candidate is not None and (best is None or sum(candidate.values()) < sum(best.values())):
+            best = candidate
+    return best
+
+
+_REPEATS = tuple(
+    getattr(sre_constants, name)
+    for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+    if hasattr(sre_constants, name)
+)
+
+
+def _build_prefilter(patterns: List[PatternInfo]) -> Tuple[Optional[Pattern[str]], int]:
+    """Build a cheap check that rules out text none of the patterns can match.
+    
+    Returns a one-character-class regex that must find something in any text
+    worth scanning (or None if no such class exists), plus the shortest
+    length a match can have.
+    """
+    items: Dict[str, int] = {}
+    min_length = None
+    for pattern_info in patterns:
+        try:
+            parsed = sre_parse.parse(pattern_info.pattern.pattern, pattern_info.pattern.flags)
+        except Exception:
+            return None, 0
+        
+        width = parsed.getwidth()[0]
+        min_length = width if min_length is None else min(min_length, width)
+        
+        required = _required_chars(parsed)
+        if required is None:
+            return None, min_length
+        items.update(required)
+    
+    if not items:
+        return None, min_length or 0
+    return re.compile(f"[{''.join(sorted(items))}]", re.IGNORECASE), min_length or 0
+
+
+# Shortest text whose prefilter check is done with one substring test per
+# admitted ASCII character instead of a regex search
+_MEMCHR_PREFILTER_LENGTH = 256
+
+# Joins strings for batch scanning; chosen because no default pattern can
+# consume it (unlike the ASCII separators, which ``\s`` matches)
+BATCH_SEPARATOR = "\x00"
+
+_ANCHORS = (
+    sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING,
+    sre_constants.AT_END, sre_constants.AT_END_STRING,
+)
+
+_NEGATED_CATEGORIES = (
+    sre_constants.CATEGORY_NOT_DIGIT, sre_constants.CATEGORY_NOT_SPACE,
+    sre_constants.CATEGORY_NOT_WORD, sre_constants.CATEGORY_NOT_LINEBREAK,
+)
+
+
+def _admits(op: object, av: Any, code: int) -> bool:
+    """Check whether a single-character opcode can match the given code point."""
+    if op is sre_constants.LITERAL:
+        return av == code
+    if op is sre_constants.RANGE:
+        return av[0] <= code <= av[1]
+    if op is sre_constants.CATEGORY:
+        return av in _NEGATED_CATEGORIES
+    if op is sre_constants.IN:
+        return any(_admits(item_op, item_av, code) for item_op, item_av in av)
+    # NOT_LITERAL, ANY, NEGATE and anything unrecognised: assume it can
+    return True
+
+
+def _is_batch_safe(pattern: Pattern[str], separator: str) -> bool:
+    """Check that joining strings with the separator cannot change a pattern's matches.
+    
+    The pattern must not be able to consume the separator (so no match spans
+    two strings, and lookarounds see it as they would the end of a string)
+    and must not anchor to the start or end of the whole text.
+    """
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return False
+    
+    code = ord(separator)
+    for op, av in _iter_ops(parsed):
+        if op is sre_constants.AT and av in _ANCHORS:
+            return False
+        if op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.ANY, sre_constants.IN):
+            if _admits(op, av, code):
+                return False
+    return True
+
+
+def _group_name(name: str, index: int, used: Dict[str, PatternInfo]) -> str:
+    """Return a unique, regex-safe group name for a pattern."""
+    if name.isidentifier() and name not in used:
+        return name
+    
+    candidate = f"_pattern{index}"
+    while candidate in used:
+        candidate = f"_{candidate}"
+    return candidate
+
+
+@lru_cache(maxsize=128)
+def _build_union(eligible: Tuple[PatternInfo, ...], backend: str) -> UnionPattern:
+    """Combine the eligible patterns into a single alternation.
+    
+    Alternatives are ordered by descending confidence so that, when two
+    patterns could match at the same position, the more specific one wins.
+    Patterns that cannot be embedded safely are scanned on their own, and
+    patterns starting with a literal prefix go through an Aho-Corasick
+    index when pyahocorasick is installed.
+    
+    Cached at module scope: registries built from the same configuration
+    (every ``DataMasker`` with the same custom patterns) share one union.
+    """
+    groups: Dict[str, PatternInfo] = {}
+    standalone: List[PatternInfo] = []
+    prefixes: List[Tuple[str, PatternInfo]] = []
+    alternatives = []
+    for index, pattern_info in enumerate(eligible):
+        if ahocorasick is not None:
+            prefix = _literal_prefix(pattern_info.pattern)
+            if len(prefix) >= MIN_LITERAL_PREFIX:
+                prefixes.append((prefix, pattern_info))
+                continue
+        body = _combinable_source(pattern_info.pattern)
+        if body is None or (backend == "re2" and (
+            _needs_unicode_classes(pattern_info.pattern) or _compile_re2(body) is None
+        )):
+            # RE2 rejects lookaround and backreferences, and its \w, \d, \s
+            # and \b are ASCII-only; scanning just those patterns with re
+            # keeps the rest of the union linear-time
+            standalone.append(pattern_info)
+            continue
+        group = _group_name(pattern_info.name, index, groups)
+        groups[group] = pattern_info
+        # Scope the flags to this alternative; under RE2 only re.ASCII
+        # patterns use the classes, and RE2's are ASCII already
+        flags = pattern_info.pattern.flags
+        scoped = ("a" if flags & re.ASCII and backend != "re2" else "") + ("i" if flags & re.IGNORECASE else "")
+        if scoped:
+            body = f"(?{scoped}:{body})"
+        alternatives.append(f"(?P<{group}>{body})")
+    
+    compiled = None
+    if alternatives:
+        source = "|".join(alternatives)
+        if backend == "re2":
+            compiled = _compile_re2(source)
+        if compiled is None:
+            compiled = re.compile(source)
+    
+    literals = LiteralPrefixIndex(prefixes) if prefixes else None
+    prefilter, min_length = _build_prefilter(list(eligible))
+    prefilter_chars = "".join(
+        char for char in map(chr, range(128)) if prefilter is not None and prefilter.match(char)
+    )
+    batch_safe = min_length > 0 and all(
+        _is_batch_safe(pattern_info.pattern, BATCH_SEPARATOR) for pattern_info in eligible
+    )
+    return UnionPattern(
+        pattern=compiled, groups=groups, standalone=standalone, literals=literals,
+        prefilter=prefilter, prefilter_chars=prefilter_chars, min_length=min_length,
+        separator=BATCH_SEPARATOR if batch_safe else None,
+        scanner=HyperscanFilter(eligible) if backend == "hyperscan" and eligible else None
+    )
+
+
 class PatternRegistry:
-    """Registry of patterns for detecting personally identifiable information."""
+    """Registry of patterns for detecting personally identifiable information.
     
-    def __init__(self):
+    The combined pattern union is compiled with Python's ``re`` by default.
+    With ``backend="re2"`` it is compiled with google-re2 instead, which
+    guarantees linear-time matching; individual patterns RE2 cannot compile
+    (lookaround, backreferences) are scanned separately with ``re``.
+    With ``backend="hyperscan"`` the union is compiled with ``re`` and each
+    ASCII text is first scanned with Hyperscan, so that only the patterns
+    that occur in it are run (and clean text is not run at all).
+    """
+    
+    def __init__(self, backend: str = "re"):
+        if backend not in REGEX_BACKENDS:
+            raise ValueError(f"Unknown regex backend '{backend}'")
+        if backend == "re2" and re2 is None:
+            raise ImportError("The 're2' backend requires the google-re2 package")
+        if backend == "hyperscan" and hyperscan is None:
+            raise ImportError("The 'hyperscan' backend requires the hyperscan package")
+        
+        self.backend = backend
         self._patterns: Dict[str, PatternInfo] = {}
+        self._unions: Dict[float, UnionPattern] = {}
         self._initialize_default_patterns()
     
     def _initialize_default_patterns(self) -> None:
@@ -30,10 +620,11 @@ class PatternRegistry:
         # Email patterns
         self.register(
             "email",
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b',
             0.95,
             "contact",
-            "Email addresses"
+            "Email addresses",
+            ascii_only=True
         )
         
         # Phone number patterns
@@ -42,7 +633,8 @@ class PatternRegistry:
             r'(\+?1[-.\s]?)?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})',
             0.9,
             "contact",
-            "US phone numbers"
+            "US phone numbers",
+            ascii_only=True
         )
         
         self.register(
@@ -50,7 +642,8 @@ class PatternRegistry:
             r'\+?[1-9]\d{1,14}',
             0.8,
             "contact",
-            "International phone numbers"
+            "International phone numbers",
+            ascii_only=True
         )
         
         # Social Security Number
@@ -59,7 +652,8 @@ class PatternRegistry:
             r'\b\d{3}-?\d{2}-?\d{4}\b',
             0.95,
             "identification",
-            "US Social Security Numbers"
+            "US Social Security Numbers",
+            ascii_only=True
         )
         
         # Credit card numbers
@@ -68,7 +662,8 @@ class PatternRegistry:
             r'\b(?:\d{4}[-\s]?){3}\d{4}\b',
             0.9,
             "financial",
-            "Credit card numbers"
+            "Credit card numbers",
+            ascii_only=True
         )
         
         # Names (basic patterns)
@@ -77,7 +672,8 @@ class PatternRegistry:
             r'\b(Mr|Mrs|Ms|Dr|Prof|Sir|Madam)\.?\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b',
             0.8,
             "personal",
-            "Names with titles"
+            "Names with titles",
+            ascii_only=True
         )
         
         # IP addresses
@@ -86,7 +682,8 @@ class PatternRegistry:
             r'\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b',
             0.95,
             "technical",
-            "IPv4 addresses"
+            "IPv4 addresses",
+            ascii_only=True
         )
         
         # MAC addresses
@@ -95,25 +692,29 @@ class PatternRegistry:
             r'\b([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})\b',
             0.95,
             "technical",
-            "MAC addresses"
+            "MAC addresses",
+            ascii_only=True
         )
         
         # URLs
         self.register(
             "url",
-            r'https?://(?:[-\w.])+(?:\:[0-9]+)?(?:/(?:[\w/_.])*(?:\?(?:[\w&=%.])*)?(?:\#(?:[\w.])*)?)?',
+            r'https?://[-\w.]+(?::[0-9]+)?(?:/[\w/.]*(?:\?[\w&=%.]*)?(?:\#[\w.]*)?)?',
             0.9,
             "technical",
             "URLs"
         )
         
-        # Address patterns (basic)
+        # Address patterns (basic); the house number and street name are
+        # bounded so a failed attempt backtracks over a few dozen characters,
+        # not the rest of the text
         self.register(
             "street_address",
-            r'\d+\s+[A-Za-z0-9\s,.-]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Lane|Ln|Boulevard|Blvd|Way|Place|Pl)\b',
+            r'\d{1,10}\s+[A-Za-z0-9\s,.-]{1,80}(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Lane|Ln|Boulevard|Blvd|Way|Place|Pl)\b',
             0.7,
             "location",
-            "Street addresses"
+            "Street addresses",
+            ascii_only=True
         )
         
         # Postal codes
@@ -122,7 +723,8 @@ class PatternRegistry:
             r'\b\d{5}(?:-\d{4})?\b',
             0.8,
             "location",
-            "US ZIP codes"
+            "US ZIP codes",
+            ascii_only=True
         )
         
         # Date of birth patterns
@@ -131,7 +733,8 @@ class PatternRegistry:
             r'\b(?:0[1-9]|1[0-2])[-/](?:0[1-9]|[12][0-9]|3[01])[-/](?:19|20)\d{2}\b',
             0.8,
             "personal",
-            "Dates (potential birth dates)"
+            "Dates (potential birth dates)",
+            ascii_only=True
         )
     
     def register(
@@ -140,10 +743,24 @@ class PatternRegistry:
         pattern: str, 
         confidence: float, 
         category: str, 
-        description: str
+        description: str,
+        ascii_only: bool = False
     ) -> None:
-        """Register a new pattern."""
-        compiled_pattern = re.compile(pattern, re.IGNORECASE)
+        """Register a new pattern.
+        
+        With ascii_only the pattern is compiled with re.ASCII, so \\d, \\w, \\b
+        and \\s skip the Unicode tables. Only formats checked to mean the same
+        on non-ASCII text should use it; user patterns keep Unicode classes.
+        """
+        # Names and categories become dict keys in every analysis; interned
+        # strings hash once and compare by identity
+        name = sys.intern(name)
+        category = sys.intern(category)
+        flags = re.ASCII if ascii_only else 0
+        # Case folding only matters to patterns that spell out letters
+        if _is_case_sensitive(pattern):
+            flags |= re.IGNORECASE
+        compiled_pattern = _compile(pattern, flags)
         self._patterns[name] = PatternInfo(
             name=name,
             pattern=compiled_pattern,
@@ -151,6 +768,25 @@ class PatternRegistry:
             category=category,
             description=description
         )
+        self._unions.clear()
+    
+    def copy_with(self, extra: Optional[Dict[str, str]] = None) -> "PatternRegistry":
+        """Return an independent copy of this registry plus extra custom patterns.
+        
+        Compiled patterns and unions are shared with this registry, so copying
+        is much cheaper than building a new one; registering on the copy does
+        not affect the original.
+        """
+        clone = copy.copy(self)
+        clone._patterns = dict(self._patterns)
+        clone._unions = dict(self._unions)
+        clone.register_custom(extra or {})
+        return clone
+    
+    def register_custom(self, patterns: Dict[str, str]) -> None:
+        """Register user-supplied patterns with the standard custom-pattern settings."""
+        for name, pattern in patterns.items():
+            self.register(name, pattern, 0.9, "custom", f"Custom pattern: {name}")
     
     def get_pattern(self, name: str) -> PatternInfo:
         """Get a pattern by name."""
@@ -169,17 +805,103 @@ class PatternRegistry:
         """Get all registered patterns."""
         return list(self._patterns.values())
     
+    def get_union(self, min_confidence: float = 0.8) -> UnionPattern:
+        """Get the combined regex for all patterns at or above a threshold."""
+        union = self._unions.get(min_confidence)
+        if union is None:
+            eligible = tuple(sorted(
+                (p for p in self._patterns.values() if p.confidence >= min_confidence),
+                key=lambda p: -p.confidence
+            ))
+            union = _build_union(eligible, self.backend)
+            self._unions[min_confidence] = union
+        return union
+    
+    def may_match(self, text: str, min_confidence: float = 0.8) -> bool:
+        """Cheaply check whether any pattern at or above a threshold could match text.
+        
+        Most strings in structured data cannot contain PII at all; a length
+        check and one character-class search are far cheaper than running
+        the full union. False means there is certainly no match.
+        """
+        union = self.get_union(min_confidence)
+        if len(text) < union.min_length:
+            return False
+        if union.prefilter is None:
+            return True
+        if len(text) >= _MEMCHR_PREFILTER_LENGTH and text.isascii():
+            # Each substring test is a C memchr over the text, many times
+            # faster than the regex engine stepping through it character by
+            # character when the text turns out to be clean
+            return any(char in text for char in union.prefilter_chars)
+        return union.prefilter.search(text) is not None
+    
+    def iter_matches(
+        self, text: str, min_confidence: float = 0.8
+    ) -> Iterator[Tuple[PatternInfo, Match[str]]]:
+        """Yield non-overlapping (pattern, match) pairs in left-to-right order."""
+        if not self.may_match(text, min_confidence):
+            return
+        union = self.get_union(min_confidence)
+        if union.scanner is not None:
+            present = union.scanner.present(text)
+            if present is not None and len(present) < len(union.scanner.patterns):
+                if not present:
+                    return
+                # Patterns that occur nowhere in the text cannot change which
+                # alternative wins anywhere, so a union of the rest finds the
+                # same matches
+                union = _build_union(present, "re")
+        
+        # Each stream yields non-overlapping matches in scan order from a
+        # given position: finditer on the union, on each standalone pattern,
+        # and the literal index
+        scans: List[Callable[[int], Iterator[Tuple[PatternInfo, Match[str]]]]] = []
+        if union.pattern is not None:
+            pattern, groups = union.pattern, union.groups
+            scans.append(lambda pos: (
+                (groups[match.lastgroup], match) for match in pattern.finditer(text, pos)
+            ))
+        for pattern_info in union.standalone:
+            scans.append(partial(_scan_standalone, pattern_info, text))
+        if union.literals is not None:
+            scans.append(lambda pos: iter(union.literals.find_matches(text, pos)))
+        
+        if len(scans) == 1:
+            yield from scans[0](0)
+            return
+        
+        # Resolve overlaps between streams like a single alternation would:
+        # of the next matches the earliest, most confident, longest wins,
+        # and scanning continues at its end. A stream whose next match
+        # overlaps the winner is rescanned from there, because that match
+        # consumed text which may hold matches of its own
+        streams = [iter(scan(0)) for scan in scans]
+        heads = [next(stream, None) for stream in streams]
+        while True:
+            live = [index for index, head in enumerate(heads) if head is not None]
+            if not live:
+                return
+            best = min(live, key=lambda index: _match_order(heads[index]))
+            pattern_info, match = heads[best]
+            yield pattern_info, match
+            
+            end = match.end()
+            heads[best] = next(streams[best], None)
+            for index in live:
+                while heads[index] is not None and heads[index][1].start() < end:
+                    if heads[index][1].end() > end:
+                        streams[index] = iter(scans[index](end))
+                    heads[index] = next(streams[index], None)
+    
     def find_matches(self, text: str, min_confidence: float = 0.8) -> List[Tuple[PatternInfo, List[re.Match]]]:
         """Find all pattern matches in text above confidence threshold."""
-        matches = []
+        grouped: Dict[str, List[re.Match]] = {}
         
-        for pattern_info in self._patterns.values():
-            if pattern_info.confidence >= min_confidence:
-                pattern_matches = list(pattern_info.pattern.finditer(text))
-                if pattern_matches:
-                    matches.append((pattern_info, pattern_matches))
+        for pattern_info, match in self.iter_matches(text, min_confidence):
+            grouped.setdefault(pattern_info.name, []).append(match)
         
-        return matches
+        return [(self._patterns[name], matches) for name, matches in grouped.items()]
     
     def list_categories(self) -> List[str]:
         """List all available categories."""
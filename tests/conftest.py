@@ -0,0 +1,46 @@
+"""
+Shared test fixtures.
+"""
+
+import pytest
+from cryptography.fernet import Fernet
+from data_masker import DataMasker, MaskingConfig, MaskingStrategy
+
+
+@pytest.fixture(scope="session")
+def session_masker():
+    """One default-config masker shared by every test that does not configure its own."""
+    return DataMasker()
+
+
+@pytest.fixture(scope="session")
+def strategy_maskers():
+    """One masker per masking strategy, keyed by the strategy."""
+    key = Fernet.generate_key().decode()
+    return {
+        strategy: DataMasker(MaskingConfig(strategy=strategy, encryption_key=key))
+        for strategy in MaskingStrategy
+    }
+
+
+@pytest.fixture(scope="session", params=["re", "re2", "hyperscan"])
+def backend_masker(request):
+    """A default-config masker for each regex backend that is installed."""
+    if request.param != "re":
+        pytest.importorskip(request.param)
+    return DataMasker(MaskingConfig(regex_backend=request.param))
+
+
+@pytest.fixture
+def masker_factory():
+    """Build maskers that differ from the default in a few settings.
+    
+    Custom patterns are added with ``add_custom_patterns``, which compiles
+    only them on top of the shared default patterns.
+    """
+    def make(custom_patterns=None, **overrides):
+        masker = DataMasker(MaskingConfig(**overrides))
+        if custom_patterns:
+            masker.add_custom_patterns(custom_patterns)
+        return masker
+    return make
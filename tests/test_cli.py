@@ -7,7 +7,7 @@ import tempfile
 from pathlib import Path
 from click.testing import CliRunner
 
-from data_masker.cli import main
+from data_masker.cli import dumps_json, main
 
 
 class TestCLI:
@@ -54,6 +54,82 @@ class TestCLI:
             Path(input_file).unlink()
             Path(output_file).unlink()
     
+    def test_mask_json_array_file(self):
+        """Test masking a file whose top level is a JSON array."""
+        runner = CliRunner()
+        
+        test_data = [
+            {"email": "john@example.com", "score": 1.5},
+            {"ssn": "123-45-6789", "tags": ["none", "555-123-4567"]}
+        ]
+        
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(test_data, f)
+            input_file = f.name
+        
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            output_file = f.name
+        
+        try:
+            result = runner.invoke(main, ['mask', input_file, output_file])
+            
+            assert result.exit_code == 0
+            
+            with open(output_file, 'r', encoding='utf-8') as f:
+                masked_data = json.load(f)
+            
+            assert masked_data[0]["email"].endswith("@example.com")
+            assert masked_data[0]["score"] == 1.5
+            assert masked_data[1]["ssn"] == "███-██-████"
+            assert masked_data[1]["tags"][0] == "none"
+            
+        finally:
+            Path(input_file).unlink()
+            Path(output_file).unlink()
+    
+    def test_dumps_json_matches_stdlib(self):
+        """Test that JSON output is formatted like json.dumps(indent=2)."""
+        data = {"name": "Zoë", "ids": [1, 2.5, None], 7: {"flag": True, "empty": []}}
+        
+        assert dumps_json(data) == json.dumps(data, indent=2, ensure_ascii=False)
+        assert json.loads(dumps_json({"big": 2 ** 70})) == {"big": 2 ** 70}
+        
+        # Floats orjson would write as null or without an exponent
+        for floats in ({"score": float("nan")}, [float("-inf")], {"rate": [1e-05]}, {1e16: 1.5}):
+            assert dumps_json(floats) == json.dumps(floats, indent=2, ensure_ascii=False)
+        
+        assert dumps_json(data, ensure_ascii=True) == json.dumps(data, indent=2)
+    
+    def test_analyze_json_escapes_non_ascii(self):
+        """Test that JSON analysis output stays ASCII, as json.dumps writes it by default."""
+        runner = CliRunner()
+        
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
+            f.write("see http://exämple.com/päth")
+            input_file = f.name
+        
+        try:
+            result = runner.invoke(main, ['analyze', input_file, '--format', 'json'])
+            
+            assert result.exit_code == 0
+            assert result.output.isascii()
+            assert json.loads(result.output)["matches"][0]["text"] == "http://exämple.com/päth"
+        finally:
+            Path(input_file).unlink()
+    
+    def test_mask_empty_yaml_file(self):
+        """Test that an empty YAML file is written back as a null document."""
+        runner = CliRunner()
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            input_file, output_file = Path(tmp, "in.yaml"), Path(tmp, "out.yaml")
+            input_file.write_text("")
+            
+            result = runner.invoke(main, ['mask', str(input_file), str(output_file)])
+            
+            assert result.exit_code == 0
+            assert output_file.read_text() == "null\n...\n"
+    
     def test_analyze_text_file(self):
         """Test analyzing a text file."""
         runner = CliRunner()
@@ -2,9 +2,13 @@
 Test the pattern detection functionality.
 """
 
+import re
+import time
+import tracemalloc
 import pytest
+from data_masker import patterns
 from data_masker.patterns import PatternRegistry, PatternInfo
-from data_masker.detectors import PIIDetector, PIIMatch
+from data_masker.detectors import PIIDetector, PIIMatch, _summarize
 from data_masker.config import MaskingConfig
 
 
@@ -55,6 +59,251 @@ class TestPatternRegistry:
         assert "email" in pattern_names
         assert "phone_us" in pattern_names
     
+    def test_ascii_patterns_compiled_with_ascii_flag(self):
+        """Test that only ASCII-only patterns get re.ASCII semantics."""
+        registry = PatternRegistry()
+        registry.register("cafe_ref", r"Café-\d+", 0.9, "test", "Cafe references")
+        
+        assert registry.get_pattern("ssn").pattern.flags & re.ASCII
+        assert not registry.get_pattern("cafe_ref").pattern.flags & re.ASCII
+        
+        # \d in the ASCII patterns no longer matches other scripts' digits
+        matches = [(info.name, m.group()) for info, m in registry.iter_matches("١٢٣-٤٥-٦٧٨٩ CAFÉ-١٢")]
+        assert matches == [("cafe_ref", "CAFÉ-١٢")]
+    
+    def test_ignorecase_only_for_patterns_with_letters(self):
+        """Test that case folding is dropped from patterns that spell out no letters."""
+        registry = PatternRegistry()
+        registry.register("ticket", r"tkt-\d{4}", 0.9, "test", "Ticket numbers")
+        
+        assert not registry.get_pattern("ssn").pattern.flags & re.IGNORECASE
+        assert registry.get_pattern("email").pattern.flags & re.IGNORECASE
+        assert [m.group() for _, m in registry.iter_matches("TKT-1234, 123-45-6789")] == [
+            "TKT-1234", "123-45-6789"
+        ]
+    
+    def test_patterns_precompiled(self):
+        """Test that patterns are compiled once and combined into one alternation."""
+        registry = PatternRegistry()
+        union = registry.get_union(0.8)
+        eligible = {info.name for info in registry._patterns.values() if info.confidence >= 0.8}
+        
+        assert all(isinstance(info.pattern, re.Pattern) for info in registry._patterns.values())
+        assert isinstance(union.pattern, re.Pattern)
+        # Only prefix-indexed and non-embeddable patterns are kept out of the union
+        separate = {info.name for info in union.standalone}
+        if union.literals is not None:
+            separate |= {info.name for info in union.literals.patterns}
+        assert {info.name for info in union.groups.values()} | separate == eligible
+        assert len(union.groups) > len(separate)
+    
+    def test_combined_alternation(self):
+        """Test that one named-group alternation finds every category in one scan."""
+        registry = PatternRegistry()
+        union = registry.get_union(0.8)
+        combined = union.pattern
+        
+        for name in ("email", "phone_us", "ssn"):
+            assert f"(?P<{name}>" in combined.pattern
+        found = list(combined.finditer("a@b.com 555-123-4567 123-45-6789"))
+        assert [match.lastgroup for match in found] == ["email", "phone_us", "ssn"]
+        assert {union.groups[match.lastgroup].category for match in found} == {"contact", "identification"}
+    
+    def test_union_prefers_higher_confidence(self):
+        """Test that overlapping patterns resolve to the most confident one."""
+        registry = PatternRegistry()
+        
+        matches = list(registry.iter_matches("SSN: 123-45-6789"))
+        
+        assert [(info.name, match.group()) for info, match in matches] == [
+            ("ssn", "123-45-6789")
+        ]
+    
+    def test_union_shared_between_registries(self):
+        """Test that identically configured registries reuse one compiled union."""
+        first, second = PatternRegistry(), PatternRegistry()
+        for registry in (first, second):
+            registry.register("employee_id", r"EMP\d{6}", 0.9, "custom", "Employee IDs")
+        
+        assert first.get_union(0.8) is second.get_union(0.8)
+        
+        second.register("badge", r"B\d{4}", 0.9, "custom", "Badges")
+        assert first.get_union(0.8) is not second.get_union(0.8)
+    
+    def test_pattern_with_backreference(self):
+        """Test that patterns unsafe for the union are still scanned."""
+        registry = PatternRegistry()
+        registry.register("repeated", r"(\w)\1{3}", 0.9, "test", "Repeated characters")
+        
+        union = registry.get_union(0.8)
+        assert registry.get_pattern("repeated") in union.standalone
+        
+        matches = list(registry.iter_matches("code xxxx or admin@company.com"))
+        assert [info.name for info, _ in matches] == ["repeated", "email"]
+    
+    def test_named_groups_joined_into_union(self):
+        """Test that inner named groups are renumbered so the pattern joins the union."""
+        registry = PatternRegistry()
+        registry.register("badge", r"(?P<site>[A-Z]{2})-(?P<num>\d{4})", 0.9, "custom", "Badges")
+        
+        union = registry.get_union(0.8)
+        assert registry.get_pattern("badge") in union.groups.values()
+        assert [m.group() for info, m in registry.iter_matches("badge NY-1234") if info.name == "badge"] == ["NY-1234"]
+    
+    def test_standalone_matches_merged_in_order(self):
+        """Test that several standalone patterns merge with the union by start."""
+        registry = PatternRegistry()
+        registry.register("repeated", r"(\w)\1{3}", 0.9, "test", "Repeated characters")
+        registry.register("doubled_z", r"(?P<z>z)(?P=z)", 0.9, "test", "Doubled z")
+        
+        matches = list(registry.iter_matches("zz admin@company.com xxxx zz"))
+        
+        assert [info.name for info, _ in matches] == ["doubled_z", "email", "repeated", "doubled_z"]
+        assert [m.start() for _, m in matches] == sorted(m.start() for _, m in matches)
+    
+    def test_overlapping_matches_resolved(self):
+        """Test that overlaps across streams keep the most confident match at a position."""
+        registry = PatternRegistry()
+        registry.register("repeated", r"(\w)\1{3}", 0.99, "test", "Repeated characters")
+        
+        matches = [(info.name, m.group()) for info, m in registry.iter_matches("xxxx@company.com and yyyy")]
+        
+        assert matches == [("repeated", "xxxx"), ("repeated", "yyyy")]
+    
+    @pytest.mark.benchmark
+    def test_no_catastrophic_backtracking(self):
+        """Test that long near-miss inputs are scanned in linear time."""
+        registry = PatternRegistry()
+        texts = ["1 " * 10000, "1" * 20000, "12345" + " A" * 10000 + "xxx", "http://" + "a." * 10000 + "/" + "a/" * 10000]
+        
+        start = time.perf_counter()
+        for text in texts:
+            list(registry.get_pattern("street_address").pattern.finditer(text))
+            list(registry.get_pattern("url").pattern.finditer(text))
+        
+        assert time.perf_counter() - start < 0.5
+        assert registry.get_pattern("street_address").pattern.search("Ship to 42 Main Street").group() == "42 Main Street"
+        assert registry.get_pattern("url").pattern.search("see https://example.com:8080/a/b?x=1#top").group() == (
+            "https://example.com:8080/a/b?x=1#top"
+        )
+    
+    def test_literal_prefix_patterns(self):
+        """Test patterns routed through the Aho-Corasick prefix index."""
+        pytest.importorskip("ahocorasick")
+        registry = PatternRegistry()
+        registry.register("employee_id", r"EMP\d{6}", 0.9, "custom", "Employee IDs")
+        
+        union = registry.get_union(0.8)
+        assert registry.get_pattern("employee_id") in union.literals.patterns
+        
+        for text in ["IDs emp123456, EMP654321", "Café EMP123456 émp654321"]:
+            found = [m.group() for info, m in registry.iter_matches(text) if info.name == "employee_id"]
+            expected = [m.group() for m in registry.get_pattern("employee_id").pattern.finditer(text)]
+            assert found == expected
+    
+    def test_literal_prefix_index_overlaps(self, monkeypatch):
+        """Test that the prefix index gives the pure-re matches where streams overlap."""
+        pytest.importorskip("ahocorasick")
+        texts = [
+            "See https://x.com/u/123-45-6789 now",
+            "http://a.io/555-123-4567",
+            "www.a.io/x@y.com and http://555-123-4567.io/123-45-6789",
+        ]
+        indexed = PatternRegistry()
+        expected = [[(i.name, m.span()) for i, m in indexed.iter_matches(text)] for text in texts]
+        assert indexed.get_union().literals is not None
+        
+        # Unions are cached by pattern set, so rebuild them without the index
+        monkeypatch.setattr(patterns, "ahocorasick", None)
+        patterns._build_union.cache_clear()
+        try:
+            scanned = PatternRegistry()
+            assert scanned.get_union().literals is None
+            actual = [[(i.name, m.span()) for i, m in scanned.iter_matches(text)] for text in texts]
+        finally:
+            patterns._build_union.cache_clear()
+        
+        assert actual == expected
+    
+    def test_re2_backend(self):
+        """Test that the RE2 backend finds the same matches as re."""
+        pytest.importorskip("re2")
+        text = "Mail admin@company.com, call (555) 123-4567, SSN 123-45-6789"
+        
+        expected = [(i.name, m.span()) for i, m in PatternRegistry().iter_matches(text)]
+        actual = [(i.name, m.span()) for i, m in PatternRegistry(backend="re2").iter_matches(text)]
+        
+        assert actual == expected
+    
+    def test_re2_backend_unicode_classes(self, monkeypatch):
+        """Test that RE2 finds the same matches as re on non-ASCII text."""
+        pytest.importorskip("re2")
+        texts = ["Name: José Núñez", "Nom: Émile", "see http://exämple.com/päth now"]
+        
+        # Keep url in the union rather than the literal prefix index
+        monkeypatch.setattr(patterns, "ahocorasick", None)
+        patterns._build_union.cache_clear()
+        try:
+            results = []
+            for backend in ("re", "re2"):
+                registry = PatternRegistry(backend=backend)
+                registry.register_custom({"full_name": r"(?:Name|Nom): \w+"})
+                results.append([[(i.name, m.span()) for i, m in registry.iter_matches(text)] for text in texts])
+            assert registry.get_pattern("url") in registry.get_union().standalone
+        finally:
+            patterns._build_union.cache_clear()
+        
+        assert results[1] == results[0]
+    
+    def test_re2_backend_with_lookaround(self):
+        """Test that a pattern RE2 rejects is scanned with re, leaving the union on RE2."""
+        pytest.importorskip("re2")
+        registry = PatternRegistry(backend="re2")
+        registry.register("order_no", r"(?<![A-Z])ORD[A-Z]{3}(?![A-Z])", 0.9, "custom", "Order codes")
+        
+        union = registry.get_union(0.8)
+        assert registry.get_pattern("order_no") in union.standalone
+        assert not isinstance(union.pattern, re.Pattern)
+        assert [i.name for i, _ in registry.iter_matches("ref ORDXYZ admin@company.com")] == ["order_no", "email"]
+    
+    def test_hyperscan_backend(self):
+        """Test that the hyperscan backend finds the same matches as re."""
+        pytest.importorskip("hyperscan")
+        registries = [PatternRegistry(), PatternRegistry(backend="hyperscan")]
+        for registry in registries:
+            # Backreferences are only approximated by Hyperscan
+            registry.register("repeated", r"(\w)\1{3}", 0.9, "test", "Repeated characters")
+        
+        for text in ["Call 555-123-4567 or mail a@example.com", "nothing to see", "zzzz", "café a@example.com"]:
+            expected, actual = ([(i.name, m.span()) for i, m in r.iter_matches(text)] for r in registries)
+            assert actual == expected
+        
+        scanner = registries[1].get_union().scanner
+        # "6789" is reported for the approximated backreference too
+        assert [p.name for p in scanner.present("SSN 123-45-6789")] == ["ssn", "repeated", "phone_international"]
+        assert scanner.present("on to it") == ()
+    
+    def test_unknown_backend(self):
+        """Test that an unknown regex backend is rejected."""
+        with pytest.raises(ValueError):
+            PatternRegistry(backend="pcre")
+    
+    def test_prefilter(self):
+        """Test the character prefilter derived from the registered patterns."""
+        registry = PatternRegistry()
+        prefilter = registry.get_union(0.8).prefilter
+        
+        assert prefilter is not None
+        assert prefilter.search("Engineering") is None
+        assert prefilter.search("admin@company") is not None
+        assert not registry.may_match("Engineering")
+        assert not registry.may_match("1")
+        assert registry.may_match("admin@company.com")
+        
+        # A pattern that can match the empty string rules out any prefilter
+        registry.register("optional", r"x*", 0.9, "test", "Optional")
+        assert registry.get_union(0.8).prefilter is None
+    
     def test_get_patterns_by_category(self):
         """Test getting patterns by category."""
         registry = PatternRegistry()
@@ -79,6 +328,16 @@ class TestPIIDetector:
         assert matches[0].text == "admin@company.com"
         assert matches[0].pattern_name == "email"
         assert matches[0].category == "contact"
+        
+        # "|" is not part of a top-level domain
+        assert [match.text for match in detector.detect_in_text("admin@company.c|m")] == []
+    
+    def test_match_has_no_instance_dict(self):
+        """Test that matches are lightweight tuples."""
+        match = PIIDetector().detect_in_text("admin@company.com")[0]
+        
+        assert not hasattr(match, "__dict__")
+        assert match._asdict()["text"] == "admin@company.com"
     
     def test_detect_phone(self):
         """Test phone number detection."""
@@ -118,6 +377,47 @@ class TestPIIDetector:
         assert "user" in results
         assert "admin_contact" in results
     
+    def test_circular_reference(self):
+        """Test that walking a container that holds itself fails instead of hanging."""
+        detector = PIIDetector()
+        data = {"email": "user@example.com"}
+        data["items"] = [{"parent": data}]
+        
+        for walk in (detector.detect_in_dict, detector.analyze_structure):
+            with pytest.raises(ValueError, match="circular reference"):
+                walk(data)
+        
+        shared = {"email": "user@example.com"}
+        assert list(detector.detect_paths({"a": shared, "b": [shared]})) == [("a", "email"), ("b", 0, "email")]
+    
+    def test_detect_paths(self):
+        """Test flat, path-keyed detection in nested data."""
+        detector = PIIDetector()
+        data = {
+            "users": [
+                {"email": "user@example.com", "age": 30},
+                {"notes": ["none", "call 555-123-4567"]}
+            ]
+        }
+        
+        results = detector.detect_paths(data)
+        
+        assert list(results) == [("users", 0, "email"), ("users", 1, "notes", 1)]
+        assert results[("users", 0, "email")][0].pattern_name == "email"
+        assert detector.detect_in_dict(data)["users"][1]["notes"][1] == results[("users", 1, "notes", 1)]
+    
+    def test_detect_batch(self):
+        """Test that batch detection matches scanning each string on its own."""
+        texts = ["admin@company.com", "", "call 555-123-4567", "Engineering", "Dr. Smith 123-45-6789"]
+        detector = PIIDetector()
+        assert detector.pattern_registry.get_union(0.8).separator is not None
+        assert detector.detect_batch(texts) == [detector.detect_in_text(t) for t in texts]
+        
+        # Anchored patterns would see the joined text, so batching is disabled
+        detector.pattern_registry.register("leading_id", r"^ID\d+", 0.9, "test", "Leading IDs")
+        assert detector.pattern_registry.get_union(0.8).separator is None
+        assert detector.detect_batch(["ID12 x", "x ID34"])[0][0].text == "ID12"
+    
     def test_confidence_threshold(self):
         """Test confidence threshold filtering."""
         config = MaskingConfig(confidence_threshold=0.95)
@@ -143,6 +443,12 @@ class TestPIIDetector:
         assert "public@company.com" not in detected_texts
         assert "private@company.com" in detected_texts
     
+    def test_whitelist_is_frozenset(self):
+        """Test that the whitelist is normalized to a frozenset."""
+        config = MaskingConfig(whitelist=["public@company.com", "public@company.com"])
+        
+        assert config.whitelist == frozenset({"public@company.com"})
+    
     def test_custom_patterns(self):
         """Test custom pattern detection."""
         config = MaskingConfig(
@@ -157,6 +463,24 @@ class TestPIIDetector:
         product_match = next(m for m in matches if m.pattern_name == "product_code")
         assert product_match.text == "PROD-1234"
     
+    def test_custom_patterns_compiled_once(self):
+        """Test that detectors with the same custom pattern share its compiled form."""
+        config = MaskingConfig(custom_patterns={"badge": r"BADGE-\d{5}"})
+        
+        first = PIIDetector(config).pattern_registry.get_pattern("badge")
+        second = PIIDetector(config).pattern_registry.get_pattern("badge")
+        
+        assert first.pattern is second.pattern
+    
+    def test_detectors_do_not_share_registrations(self):
+        """Test that registering on one detector leaves other detectors untouched."""
+        first, second = PIIDetector(), PIIDetector()
+        first.pattern_registry.register("badge", r"BADGE[A-Z]{3}", 0.9, "custom", "Badges")
+        
+        assert first.detect_in_text("BADGEXYZ")
+        assert not second.detect_in_text("BADGEXYZ")
+        assert not PIIDetector().detect_in_text("BADGEXYZ")
+    
     def test_analyze_text(self):
         """Test text analysis functionality."""
         detector = PIIDetector()
@@ -168,3 +492,40 @@ class TestPIIDetector:
         assert "contact" in analysis["categories"]
         assert "email" in analysis["patterns"]
         assert len(analysis["matches"]) > 0
+    
+    def test_analyze_text_without_matches(self):
+        """Test that analysis can skip keeping the matches."""
+        detector = PIIDetector()
+        text = "John Doe's email is john@example.com and phone is 555-123-4567"
+        
+        analysis = detector.analyze_text(text, return_matches=False)
+        
+        assert "matches" not in analysis
+        assert analysis["total_matches"] == len(detector.detect_in_text(text))
+    
+    def test_summary_streams_matches(self):
+        """Test that counting matches it does not return keeps none of them around."""
+        match = PIIMatch("a@b.com", 0, 7, "email", 0.95, "contact")
+        
+        tracemalloc.start()
+        try:
+            stats = _summarize((match for _ in range(100_000)), return_matches=False)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        
+        assert stats["total_matches"] == 100_000
+        assert stats["patterns"] == {"email": 100_000}
+        # A list of the matches alone would take 800 kB
+        assert peak < 100_000
+    
+    def test_confidence_distribution_boundaries(self):
+        """Test that confidence buckets include their lower bound."""
+        config = MaskingConfig(confidence_threshold=0.7)
+        detector = PIIDetector(config)
+        detector.pattern_registry.register("medium_code", r"MED[A-Z]{3}", 0.7, "test", "Medium")
+        
+        analysis = detector.analyze_text("admin@company.com MEDABC (555) 123-4567")
+        
+        assert analysis["confidence_distribution"] == {"high": 2, "medium": 1, "low": 0}
+        assert analysis["patterns"].most_common(1)[0][1] == 1
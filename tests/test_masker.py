@@ -2,96 +2,339 @@
 Test the basic masking functionality.
 """
 
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import pytest
+from cryptography.fernet import Fernet
 from data_masker import DataMasker, MaskingConfig, MaskingStrategy
+from data_masker.masker import _thread_fakers
+
+
+# Values the tests mask over and over, bound once
+EMAIL = "john@example.com"
+EMAIL_DOMAIN = "@example.com"
+
+ANALYZE_LINE = "Contact John Doe at john@example.com or 555-123-4567"
+
+# Many records in one buffer, analyzed in a single scan
+ANALYZE_CORPUS = "\n".join([ANALYZE_LINE] * 32)
+
+# Substring each strategy leaves in place of an email
+MARKERS = {
+    MaskingStrategy.REPLACE: "█",
+    MaskingStrategy.REDACT: "[REDACTED]",
+    MaskingStrategy.ENCRYPT: "[ENCRYPTED:",
+    MaskingStrategy.TOKENIZE: "[EMAIL_TOKEN_",
+    MaskingStrategy.FAKER: "@",  # Faker always produces a realistic email
+}
 
 
 class TestDataMasker:
     """Test cases for DataMasker class."""
     
-    def test_mask_email(self):
-        """Test email masking."""
-        masker = DataMasker()
-        text = "Contact us at john.doe@example.com for more info"
-        masked = masker.mask_text(text)
+    @pytest.mark.parametrize("text,forbidden,required", [
+        ("Contact us at john.doe@example.com for more info", "john.doe@example.com", EMAIL_DOMAIN),
+        ("Call us at +1-555-123-4567", "+1-555-123-4567", "+█-███-███-████"),
+        ("SSN: 123-45-6789", "123-45-6789", "███-██-████"),
+    ])
+    def test_mask_basic(self, session_masker, text, forbidden, required):
+        """Test email, phone and SSN masking with the default configuration."""
+        masked = session_masker.mask_text(text)
         
-        assert "john.doe@example.com" not in masked
-        assert "@example.com" in masked  # Domain preserved by default
-        assert "Contact us at" in masked
+        assert forbidden not in masked
+        assert required in masked
+        assert masked.startswith(text[:text.index(forbidden)])  # Surrounding text kept
     
-    def test_mask_phone(self):
-        """Test phone number masking."""
-        masker = DataMasker()
-        text = "Call us at +1-555-123-4567"
-        masked = masker.mask_text(text)
+    @pytest.mark.parametrize("text,expected", [
+        ("Call us at +1-555-123-4567", "Call us at +█-███-███-████"),
+        ("SSN: 123-45-6789", "SSN: ███-██-████"),
+    ])
+    def test_mask_all_backends(self, backend_masker, text, expected):
+        """Test that every regex backend masks phone numbers and SSNs alike."""
+        assert backend_masker.mask_text(text) == expected
+    
+    def test_mask_credit_card(self):
+        """Test credit card masking keeps the formatting and the last four digits."""
+        masker = DataMasker(MaskingConfig(mask_character="*"))
+        masked = masker.mask_text("Card: 4111-1111-1111-1234")
         
-        assert "+1-555-123-4567" not in masked
-        assert "+█-███-███-████" in masked
+        assert masked == "Card: ****-****-****-1234"
     
-    def test_mask_ssn(self):
-        """Test SSN masking."""
-        masker = DataMasker()
-        text = "SSN: 123-45-6789"
-        masked = masker.mask_text(text)
+    def test_full_mask_lengths(self):
+        """Test that full masking keeps the length of short and long values."""
+        config = MaskingConfig(preserve_format=False, custom_patterns={"long_code": r"Q{130,}"})
+        masker = DataMasker(config)
+        
+        assert masker.mask_text("SSN 123-45-6789") == "SSN " + "█" * 11
+        assert masker.mask_text("Q" * 140) == "█" * 140
+    
+    def test_mask_bytes(self, session_masker):
+        """Test that encoded text is masked like the decoded string."""
+        masker = session_masker
+        data = "Café bill for john@example.com".encode()
+        
+        assert masker.mask_bytes(data) == masker.mask_text(data.decode()).encode()
+        assert masker.mask_bytes(b"nothing here") == b"nothing here"
+    
+    def test_mask_text_bytes_input(self, session_masker):
+        """Test that bytes given to mask_text come back as masked bytes."""
+        data = b"Contact us at john.doe@example.com"
+        masked = session_masker.mask_text(data)
+        
+        assert masked == session_masker.mask_bytes(data)
+        assert isinstance(masked, bytes)
+        assert b"john.doe@example.com" not in masked
+    
+    def test_mask_invalid_bytes(self, session_masker):
+        """Test that bytes invalid in the encoding are kept as they are around masked values."""
+        data = b"\xff\xfe Mail john@example.com \xc3("
+        masked = session_masker.mask_text(data)
+        
+        assert masked.startswith(b"\xff\xfe Mail ")
+        assert masked.endswith(b"@example.com \xc3(")
+        assert b"john@" not in masked
+        assert session_masker.mask_bytes(b"\xff clean") == b"\xff clean"
+    
+    def test_mask_bytes_in_containers(self, session_masker):
+        """Test that bytes values are masked like mask_bytes wherever they appear."""
+        data = b"Mail john@example.com"
+        expected = session_masker.mask_bytes(data)
         
-        assert "123-45-6789" not in masked
-        assert "███-██-████" in masked
+        assert session_masker.mask(data) == expected
+        assert session_masker.mask_dict({"raw": data, "nested": [data]}) == {"raw": expected, "nested": [expected]}
+        assert expected != data
     
-    def test_mask_dict(self):
+    def test_mask_dict(self, session_masker):
         """Test dictionary masking."""
-        masker = DataMasker()
+        masker = session_masker
         data = {
             "name": "John Doe",
-            "email": "john@example.com",
+            "email": EMAIL,
             "phone": "555-123-4567",
             "age": 30
         }
         
         masked = masker.mask(data)
         
-        assert masked["email"] != "john@example.com"
-        assert "@example.com" in masked["email"]
+        assert masked["email"] != EMAIL
+        assert EMAIL_DOMAIN in masked["email"]
         assert masked["phone"] != "555-123-4567"
         assert masked["age"] == 30  # Not PII, should remain unchanged
     
-    def test_redact_strategy(self):
-        """Test redaction strategy."""
-        config = MaskingConfig(strategy=MaskingStrategy.REDACT)
-        masker = DataMasker(config)
+    def test_mask_dict_matches_mask_text(self, session_masker):
+        """Test that batch-scanned leaves are masked exactly like single strings."""
+        masker = session_masker
+        data = {
+            "contact": [EMAIL, "call 555-123-4567", ""],
+            "billing": {"card": "4111 1111 1111 1234", "note": "Engineering"},
+            "ssn": "123-45-6789"
+        }
         
-        text = "Email: john@example.com"
-        masked = masker.mask_text(text)
+        masked = masker.mask(data)
         
-        assert "[REDACTED]" in masked
-        assert "john@example.com" not in masked
+        assert masked["contact"] == [masker.mask_text(text) for text in data["contact"]]
+        assert masked["billing"] == {key: masker.mask_text(text) for key, text in data["billing"].items()}
+        assert masked["ssn"] == masker.mask_text(data["ssn"])
+        assert list(masked) == list(data)
     
-    def test_tokenize_strategy(self):
-        """Test tokenization strategy."""
-        config = MaskingConfig(strategy=MaskingStrategy.TOKENIZE)
-        masker = DataMasker(config)
+    def test_mask_subclassed_containers(self, session_masker):
+        """Test that str, dict and list subclasses are still masked."""
+        from collections import OrderedDict
         
-        text = "Email: john@example.com"
-        masked = masker.mask_text(text)
+        class Email(str):
+            pass
+        
+        masker = session_masker
+        masked = masker.mask(OrderedDict(contact=Email(EMAIL), flags=[True, 1.5, None]))
         
-        assert "[EMAIL_TOKEN_" in masked
-        assert "john@example.com" not in masked
+        assert EMAIL_DOMAIN in masked["contact"]
+        assert masked["contact"] != EMAIL
+        assert masked["flags"] == [True, 1.5, None]
     
-    def test_custom_patterns(self):
-        """Test custom pattern detection."""
+    def test_mask_deeply_nested(self, session_masker):
+        """Test that nesting deeper than the recursion limit is masked."""
+        data = node = {}
+        for _ in range(5000):
+            node["next"] = [{}]
+            node = node["next"][0]
+        node["email"] = EMAIL
+        
+        masked = session_masker.mask(data)
+        
+        for _ in range(5000):
+            masked = masked["next"][0]
+        assert masked["email"] != EMAIL
+    
+    def test_mask_circular_reference(self, session_masker):
+        """Test that a container holding itself is rejected, while shared ones are masked."""
+        data = {"email": EMAIL}
+        data["self"] = [data]
+        with pytest.raises(ValueError, match="circular reference"):
+            session_masker.mask_dict(data)
+        
+        shared = {"email": EMAIL}
+        masked = session_masker.mask_list([shared, {"again": shared}])
+        assert masked[0]["email"] == masked[1]["again"]["email"] != EMAIL
+    
+    @pytest.mark.parametrize("strategy", list(MaskingStrategy))
+    def test_strategy(self, strategy_maskers, strategy):
+        """Test that every strategy masks an email with its own marker."""
+        masked = strategy_maskers[strategy].mask_text("Email: john@example.com")
+        
+        assert MARKERS[strategy] in masked
+        assert EMAIL not in masked
+        assert masked.startswith("Email: ")
+    
+    def test_many_matches_in_one_string(self):
+        """Test that every match of a long line is replaced and the text between kept."""
+        masker = DataMasker(MaskingConfig(strategy=MaskingStrategy.REDACT))
+        text = " ".join(f"row {chr(65 + i)}: 123-45-{6700 + i}" for i in range(20))
+        
+        assert masker.mask_text(text) == " ".join(f"row {chr(65 + i)}: [REDACTED]" for i in range(20))
+    
+    def test_overlapping_matches_masked_once(self):
+        """Test that a match overlapping an earlier one is not spliced in again."""
         config = MaskingConfig(
-            custom_patterns={"employee_id": r"EMP\d{6}"}
+            strategy=MaskingStrategy.REDACT,
+            custom_patterns={"repeated": r"(\w)\1{3}"}
         )
         masker = DataMasker(config)
         
+        assert masker.mask_text("Mail xxxx@company.com now") == "Mail [REDACTED] now"
+        # Backreferences compare ignoring case, as for any other custom pattern
+        assert masker.mask_text("code xXxX") == "code [REDACTED]"
+    
+    @pytest.mark.parametrize("text,expected", [
+        ("See https://x.com/u/123-45-6789 now", "See [REDACTED]-[REDACTED]-[REDACTED] now"),
+        ("http://a.io/555-123-4567", "[REDACTED]-[REDACTED]-[REDACTED]"),
+    ])
+    def test_text_after_overlap_rescanned(self, strategy_maskers, text, expected):
+        """Test that numbers in a URL path past the URL match are still masked."""
+        assert strategy_maskers[MaskingStrategy.REDACT].mask_text(text) == expected
+    
+    def test_encrypt_strategy(self):
+        """Test that batch-encrypted values are standard Fernet tokens."""
+        key = Fernet.generate_key().decode()
+        masker = DataMasker(MaskingConfig(strategy=MaskingStrategy.ENCRYPT, encryption_key=key))
+        
+        masked = masker.mask_text("Mail john@example.com, SSN 123-45-6789")
+        tokens = [part.split("]")[0] for part in masked.split("[ENCRYPTED:")[1:]]
+        
+        assert [Fernet(key.encode()).decrypt(token.encode()).decode() for token in tokens] == [
+            EMAIL, "123-45-6789"
+        ]
+        assert masker.decrypt(f"[ENCRYPTED:{tokens[0]}]") == EMAIL
+    
+    def test_tokens_are_stable(self, strategy_maskers):
+        """Test that tokens are stable across processes, unlike hash()."""
+        masker = strategy_maskers[MaskingStrategy.TOKENIZE]
+        
+        assert masker.mask_text("Email: john@example.com") == "Email: [EMAIL_TOKEN_0146]"
+    
+    def test_tokenize_cache_reused(self):
+        """Test that a repeated value is tokenized once and then served from the cache."""
+        masker = DataMasker(MaskingConfig(strategy=MaskingStrategy.TOKENIZE))
+        first = masker.mask_text("Email: john@example.com")
+        for _ in range(1000):
+            assert masker.mask_text("Email: john@example.com") == first
+        
+        assert list(masker._mask_cache.values()) == ["[EMAIL_TOKEN_0146]"]
+    
+    @pytest.mark.benchmark
+    def test_tokenize_cache_is_linear(self, strategy_maskers):
+        """Test that tokenizing unique values scales linearly."""
+        masker = strategy_maskers[MaskingStrategy.TOKENIZE]
+        
+        def elapsed(count):
+            start = time.perf_counter()
+            for i in range(count):
+                masker.mask_text(f"Email: user{count}x{i}@example.com")
+            return time.perf_counter() - start
+        
+        assert elapsed(4000) < 4 * elapsed(2000)
+    
+    def test_faker_strategy(self, strategy_maskers):
+        """Test that fake values are drawn from the matching Faker provider."""
+        masker = strategy_maskers[MaskingStrategy.FAKER]
+        
+        masked = masker.mask_text(EMAIL)
+        
+        assert masked != EMAIL
+        assert "@" in masked
+    
+    def test_faker_created_lazily(self):
+        """Test that Faker is only set up once a value is faked, once per thread and locale."""
+        def fakers_after(masker):
+            masker.mask_text(EMAIL)
+            return dict(getattr(_thread_fakers, "by_locale", {}))
+        
+        # A fresh thread starts without any Faker
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            assert pool.submit(fakers_after, DataMasker()).result() == {}
+            faker_masker = DataMasker(MaskingConfig(strategy=MaskingStrategy.FAKER))
+            assert list(pool.submit(fakers_after, faker_masker).result()) == ["en_US"]
+        
+        # Maskers in the same thread share one Faker per locale
+        assert DataMasker(MaskingConfig(strategy=MaskingStrategy.FAKER)).faker is faker_masker.faker
+    
+    def test_faker_missing_provider_falls_back(self):
+        """Test that a locale without the provider for a pattern falls back to replace."""
+        masker = DataMasker(MaskingConfig(strategy=MaskingStrategy.FAKER, locale="en_PH"))
+        
+        assert masker.mask_text("Call 555-123-4567") == "Call ███-███-████"
+    
+    def test_faker_per_thread(self):
+        """Test that a masker used from another thread fakes with that thread's Faker."""
+        masker = DataMasker(MaskingConfig(strategy=MaskingStrategy.FAKER))
+        masker.mask_text(EMAIL)
+        
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            other = pool.submit(lambda: masker.faker).result()
+        
+        assert other is not masker.faker
+        assert masker.faker is masker.faker
+    
+    def test_repeated_values_masked_consistently(self):
+        """Test that a repeated value gets the same fake, but a fresh ciphertext."""
+        faker_masker = DataMasker(MaskingConfig(strategy=MaskingStrategy.FAKER))
+        first, second, third = faker_masker.mask_text("a@example.com b@example.com a@example.com").split()
+        
+        assert third == first
+        assert second != first
+        assert faker_masker.mask_text("a@example.com") == first
+        
+        key = Fernet.generate_key().decode()
+        encrypt_masker = DataMasker(MaskingConfig(strategy=MaskingStrategy.ENCRYPT, encryption_key=key))
+        assert encrypt_masker.mask_text("a@example.com") != encrypt_masker.mask_text("a@example.com")
+    
+    def test_custom_patterns(self, masker_factory, session_masker):
+        """Test custom pattern detection."""
+        masker = masker_factory(custom_patterns={"employee_id": r"EMP\d{6}"})
+        
         text = "Employee ID: EMP123456"
         masked = masker.mask_text(text)
         
         assert "EMP123456" not in masked
+        assert masker.config.custom_patterns == {"employee_id": r"EMP\d{6}"}
+        with pytest.raises(ValueError):  # Other maskers are unaffected
+            session_masker.detector.pattern_registry.get_pattern("employee_id")
+    
+    def test_custom_patterns_match_unicode(self, masker_factory):
+        """Test that custom patterns keep Unicode \\w on non-ASCII text."""
+        custom_patterns = {"full_name": r"Name: \w+"}
+        maskers = [
+            masker_factory(strategy=MaskingStrategy.REDACT, custom_patterns=custom_patterns),
+            DataMasker(MaskingConfig(strategy=MaskingStrategy.REDACT, custom_patterns=custom_patterns)),
+        ]
+        
+        for masker in maskers:
+            assert masker.mask_text("Name: José Núñez") == "[REDACTED] Núñez"
     
-    def test_whitelist(self):
+    def test_whitelist(self, masker_factory):
         """Test whitelisting functionality."""
-        config = MaskingConfig(whitelist=["admin@company.com"])
-        masker = DataMasker(config)
+        masker = masker_factory(whitelist={"admin@company.com"})
         
         text = "Contact admin@company.com or user@example.com"
         masked = masker.mask_text(text)
@@ -99,16 +342,114 @@ class TestDataMasker:
         assert "admin@company.com" in masked  # Whitelisted
         assert "user@example.com" not in masked  # Should be masked
     
-    def test_analyze(self):
-        """Test analysis functionality."""
-        masker = DataMasker()
-        text = "Contact John Doe at john@example.com or 555-123-4567"
+    @pytest.mark.benchmark
+    @pytest.mark.parametrize("size", [1, 100, 10_000])
+    def test_whitelist_size_does_not_slow_masking(self, masker_factory, size):
+        """Test that whitelist checks take the same time however long the whitelist is."""
+        corpus = [f"Contact user{i}@example.com" for i in range(2000)]
         
-        analysis = masker.analyze(text)
+        def best_time(masker):
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                for text in corpus:
+                    masker.mask_text(text)
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+        
+        baseline = best_time(masker_factory(whitelist={"admin@company.com"}))
+        whitelist = {"admin@company.com"} | {f"staff{i}@company.com" for i in range(size - 1)}
+        
+        assert best_time(masker_factory(whitelist=whitelist)) < 2 * baseline
+    
+    def test_analyze(self, session_masker):
+        """Test analysis functionality."""
+        analysis = session_masker.analyze(ANALYZE_CORPUS)
         
-        assert analysis["total_matches"] > 0
+        assert analysis["total_matches"] >= 32
+        assert analysis["total_matches"] == 32 * session_masker.analyze(ANALYZE_LINE)["total_matches"]
         assert "contact" in analysis["categories"]
         assert analysis["confidence_distribution"]["high"] > 0
+    
+    def test_analyze_returns_counters(self, session_masker):
+        """Test that analysis counts are Counters, with every confidence bucket present."""
+        analysis = session_masker.analyze(f"{EMAIL} 555-123-4567")
+        
+        assert isinstance(analysis["categories"], Counter)
+        assert isinstance(analysis["confidence_distribution"], Counter)
+        assert list(analysis["confidence_distribution"]) == ["high", "medium", "low"]
+        assert sum(analysis["confidence_distribution"].values()) == analysis["total_matches"]
+    
+    def test_analyze_structure(self, session_masker):
+        """Test that nested data is analyzed string by string."""
+        masker = session_masker
+        data = {"user": {"email": EMAIL, "age": 30}, "notes": ["SSN 123-45-6789", "none"]}
+        
+        analysis = masker.analyze(data)
+        
+        assert analysis["total_matches"] == 2
+        assert analysis["patterns"] == {"email": 1, "ssn": 1}
+        assert [(match.start, match.end) for match in analysis["matches"]] == [(0, 16), (4, 15)]
+    
+    def test_mask_many(self):
+        """Test masking many records across worker processes."""
+        masker = DataMasker()
+        records = [
+            {"email": f"user{i}@example.com", "ssn": "123-45-6789", "id": i}
+            for i in range(100)
+        ]
+        
+        masked = masker.mask_many(records, chunksize=10, workers=2)
+        
+        assert masked == [masker.mask(record) for record in records]
+    
+    def test_batch_mask_dict(self, session_masker):
+        """Test that the string values of many records are scanned in batches and spliced back."""
+        records = [{"email": f"u{i}@example.com", "age": i} for i in range(10_000)]
+        
+        masked = session_masker.mask_many(records, chunksize=1000, workers=1)
+        
+        assert len(masked) == 10_000
+        assert all(EMAIL_DOMAIN in r["email"] and "u" not in r["email"].split("@")[0] for r in masked)
+        assert [r["age"] for r in masked] == list(range(10_000))
+    
+    def test_survives_re_cache_eviction(self, session_masker):
+        """Test that the masker keeps its own compiled patterns rather than relying on re's cache."""
+        text = f"Email: {EMAIL} and SSN 123-45-6789"
+        expected = session_masker.mask_text(text)
+        registry = session_masker.detector.pattern_registry
+        union = registry.get_union(session_masker.config.confidence_threshold)
+        email = registry.get_pattern("email").pattern
+        for i in range(1024):
+            re.match(fr"_junk_{i}_(\d+)", "")
+        re.purge()
+        
+        assert session_masker.mask_text(text) == expected
+        assert registry.get_union(session_masker.config.confidence_threshold) is union
+        assert registry.get_pattern("email").pattern is email
+    
+    @pytest.mark.benchmark
+    def test_single_pass_scaling(self, session_masker):
+        """Test that a 1 MiB corpus with sparse PII is masked in one quick scan."""
+        corpus = ("lorem ipsum " * 50 + "a@b.com ") * 1750
+        
+        start = time.perf_counter()
+        masked = session_masker.mask_text(corpus)
+        
+        assert time.perf_counter() - start < 2.0
+        assert masked.count("@b.com") == 1750
+    
+    @pytest.mark.benchmark
+    def test_clean_input_fast_path(self, session_masker):
+        """Test that a 1 MB string no pattern can match is ruled out without a regex scan."""
+        text = "x" * 1_000_000
+        
+        start = time.perf_counter()
+        masked = session_masker.mask_text(text)
+        
+        assert time.perf_counter() - start < 0.01
+        assert masked is text
+        assert session_masker.mask_text(text + " 123-45-6789").endswith(" ███-██-████")
 
 
 class TestMaskingConfig:
@@ -134,3 +475,47 @@ class TestMaskingConfig:
         assert config.strategy == MaskingStrategy.FAKER
         assert config.mask_character == "*"
         assert config.confidence_threshold == 0.9
+    
+    def test_fast_create(self):
+        """Test that unvalidated construction matches a validated config."""
+        values = {"strategy": MaskingStrategy.REDACT, "confidence_threshold": 0.9}
+        
+        assert MaskingConfig.fast_create(**values) == MaskingConfig(**values)
+        assert MaskingConfig.fast_create().whitelist == frozenset()
+    
+    def test_config_shared_not_copied(self):
+        """Test that a masker and its detector hold one config instance between them."""
+        config = MaskingConfig()
+        masker = DataMasker(config)
+        
+        other = DataMasker(config)
+        
+        assert masker.config is config
+        assert masker.detector.config is config
+        assert other.config is masker.config
+        # The compiled default patterns are shared too
+        assert other.detector.pattern_registry.get_pattern("email") is (
+            masker.detector.pattern_registry.get_pattern("email")
+        )
+    
+    def test_lazy_custom_pattern_compile(self):
+        """Test that custom patterns are compiled by the masker, not by the config."""
+        from data_masker.patterns import _compile
+        
+        # The first masker in the process compiles the built-in patterns
+        DataMasker().mask_text(EMAIL)
+        compiled = _compile.cache_info().misses
+        configs = [MaskingConfig(custom_patterns={f"k{i}": fr"LAZY{i}X\d+"}) for i in range(10_000)]
+        assert _compile.cache_info().misses == compiled
+        
+        masker = DataMasker(configs[0])
+        assert masker.mask_text("LAZY0X123") != "LAZY0X123"
+        assert _compile.cache_info().misses == compiled + 1
+    
+    def test_whitelist_is_frozenset(self):
+        """Test that the whitelist is frozen once and shared with the detector as is."""
+        config = MaskingConfig(whitelist={"a@b.com"})
+        
+        assert isinstance(config.whitelist, frozenset)
+        assert isinstance(MaskingConfig.fast_create(whitelist={"a@b.com"}).whitelist, frozenset)
+        assert DataMasker(config).detector.config.whitelist is config.whitelist